@@ -1,3 +1,9 @@
+import os
+import sys
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
+import instrument
+
 def load_lists(filename: str) -> tuple[list[int], list[int]]:
     """Load two lists from an input file and sort them. The input data is rows
     of two columns of numbers which are not sorted."""
@@ -30,9 +36,20 @@ if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(prog='AOC2024-d01')
     parser.add_argument('filename')
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
     args = parser.parse_args()
 
-    list_a, list_b = load_lists(args.filename)
+    instrument.enable(profile=args.profile is not None)
+
+    with instrument.timer('load'):
+        list_a, list_b = load_lists(args.filename)
+    instrument.count('pairs', len(list_a))
 
-    print("Total distance: ", total_distance(list_a, list_b))
-    print("Similarity: ", similarity(list_a, list_b))
+    with instrument.timer('distance'):
+        distance = total_distance(list_a, list_b)
+    print("Total distance: ", distance)
+    with instrument.timer('similarity'):
+        similarity_score = similarity(list_a, list_b)
+    print("Similarity: ", similarity_score)
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
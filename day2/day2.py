@@ -1,4 +1,13 @@
-from typing import Generator, Literal, NewType
+from typing import BinaryIO, Callable, Generator, Literal, NewType
+from collections import Counter
+from functools import partial
+from itertools import pairwise
+import os
+import sys
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
+import instrument
+from parallel import fork_pool, bounded_imap
 
 Level = NewType('Level', int)
 Report = list[Level]
@@ -55,13 +64,135 @@ def is_safe_with_repair(report: Report) -> bool:
     one repair."""
     return any(is_safe(candidate) for candidate in candidate_repairs(report))
 
+def is_safe_with_repair_linear(report: Report) -> bool:
+    """Same as `is_safe_with_repair`, in a single scan of the report without
+    building any candidates.
+
+    A level can only be kept if it steps 1 to 3 in the report's direction from
+    the last kept level. For each direction, after each level, this tracks
+    whether every level so far is kept (`up`/`down`), whether every level up to
+    the one before is kept (`*_before`, so that level may be removed), and
+    whether every level so far is kept but one before it (`*_repaired`)."""
+    if len(report) <= 2:
+        return True
+    first_step = report[1] - report[0]
+    up_before, up, up_repaired = True, 1 <= first_step <= 3, True
+    down_before, down, down_repaired = True, -3 <= first_step <= -1, True
+    for i in range(2, len(report)):
+        # The step from the previous level, and from the one before that if
+        # the previous level is removed.
+        step, skip = report[i] - report[i - 1], report[i] - report[i - 2]
+        step_up, skip_up = 1 <= step <= 3, 1 <= skip <= 3
+        step_down, skip_down = -3 <= step <= -1, -3 <= skip <= -1
+        up_before, up, up_repaired = up, up and step_up, (up_repaired and step_up) or (up_before and skip_up)
+        down_before, down, down_repaired = down, down and step_down, (down_repaired and step_down) or (down_before and skip_down)
+        if not (up or up_before or up_repaired or down or down_before or down_repaired):
+            return False
+    # Removing the last level is the only repair not yet considered.
+    return up or up_before or up_repaired or down or down_before or down_repaired
+
+FailureReason = Literal['unchanged', 'too large', 'turned']
+
+def failure_reason(report: Report) -> FailureReason | None:
+    """The first way in which adjacent levels break the rules of `is_safe`, or
+    None if the report is safe: a level the same as the one before, a step of
+    more than three, or a step in the opposite direction from the first."""
+    direction = 0
+    for a, b in pairwise(report):
+        step = b - a
+        if step == 0:
+            return 'unchanged'
+        if step < -3 or step > 3:
+            return 'too large'
+        if direction != 0 and valence(step) != direction:
+            return 'turned'
+        direction = valence(step)
+    return None
+
+def read_chunks(source: BinaryIO, chunk_size: int) -> Generator[bytes, None, None]:
+    """Reads the source in chunks of about `chunk_size` bytes, each ending at
+    the end of a line so that no report is split between chunks."""
+    carry = b''
+    while True:
+        chunk = source.read(chunk_size)
+        if len(chunk) == 0:
+            if len(carry) > 0:
+                yield carry
+            return
+        data = carry + chunk if carry else chunk
+        cut = data.rfind(b'\n') + 1
+        if cut > 0:
+            yield data[:cut]
+        carry = data[cut:]
+
+def check_chunk(chunk: bytes, reasons: bool = False) -> Counter[str]:
+    """Counts the reports in a chunk that are safe, safe once repaired, and
+    unsafe. With `reasons`, also counts why each report that is not safe as it
+    stands fails."""
+    counts = Counter()
+    lines = chunk.split(b'\n')
+    if chunk.endswith(b'\n'):
+        lines.pop()
+    for line in lines:
+        report = [int(level) for level in line.split()]
+        reason = failure_reason(report)
+        if reason is None:
+            counts['safe'] += 1
+            continue
+        counts['repaired' if is_safe_with_repair_linear(report) else 'unsafe'] += 1
+        if reasons:
+            counts[reason] += 1
+    return counts
+
+type ChunkCheck = Callable[[bytes, bool], Counter[str]]
+
+def stream_safety_counts(filename: str,
+                         workers: int = 1,
+                         chunk_size: int = 1 << 20,
+                         reasons: bool = False,
+                         check: ChunkCheck = check_chunk) -> Counter[str]:
+    """Checks every report in the file, reading it in chunks of about
+    `chunk_size` bytes, each checked with `check`. With more than one worker,
+    chunks are checked in a process pool with a bounded number in flight, so
+    memory use does not grow with the file."""
+    totals = Counter()
+    with open(filename, 'rb') as file:
+        chunks = instrument.metered('chunks', read_chunks(file, chunk_size))
+        if workers <= 1:
+            for chunk in chunks:
+                totals.update(check(chunk, reasons))
+            return totals
+
+        with fork_pool(workers) as pool:
+            for counts in bounded_imap(pool, partial(check, reasons=reasons), chunks, workers * 2):
+                totals.update(counts)
+    return totals
+
 if __name__ == '__main__':
     import argparse
-    from more_itertools import quantify
 
     parser = argparse.ArgumentParser(prog='AOC2024-d01')
     parser.add_argument('filename')
+    parser.add_argument('--workers', '-w', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=1 << 20, help="bytes per chunk")
+    parser.add_argument('--reasons', action="store_true", help="count why reports are not safe")
+    parser.add_argument('--vectorized', action="store_true", help="parse and check each chunk with NumPy")
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
     args = parser.parse_args()
 
-    safe_reports = quantify(load_reports(args.filename), is_safe_with_repair)
-    print("Safe reports: ", safe_reports)
\ No newline at end of file
+    instrument.enable(profile=args.profile is not None)
+
+    check = check_chunk
+    if args.vectorized:
+        import day2_vectorized
+        check = day2_vectorized.check_chunk
+    with instrument.timer('check'):
+        counts = stream_safety_counts(args.filename, args.workers, args.chunk_size, args.reasons, check)
+    instrument.count('reports', counts['safe'] + counts['repaired'] + counts['unsafe'])
+    print("Safe reports: ", counts['safe'] + counts['repaired'])
+    print(f"safe as is: {counts['safe']}, repaired: {counts['repaired']}, unsafe: {counts['unsafe']}")
+    if args.reasons:
+        for reason in FailureReason.__args__:
+            print(f"{reason}: {counts[reason]}")
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
@@ -0,0 +1,88 @@
+import io
+import os
+import random
+import unittest
+from collections import Counter
+from day2 import (is_safe, is_safe_with_repair, is_safe_with_repair_linear, failure_reason, read_chunks, check_chunk,
+                  stream_safety_counts)
+import day2_vectorized
+from day2_vectorized import pack_reports, parse_reports, safety_masks
+
+def random_report(rng: random.Random) -> list[int]:
+    # Mostly steady runs, with a few bad steps mixed in.
+    level, direction = rng.randint(1, 20), rng.choice([-1, 1])
+    report = []
+    for _ in range(rng.randint(0, 9)):
+        report.append(level)
+        level += direction * rng.randint(1, 3) if rng.random() < 0.8 else rng.randint(-5, 5)
+    return report
+
+class RepairTests(unittest.TestCase):
+    def test_example(self):
+        reports = [[7, 6, 4, 2, 1], [1, 2, 7, 8, 9], [9, 7, 6, 2, 1],
+                   [1, 3, 2, 4, 5], [8, 6, 4, 4, 1], [1, 3, 6, 7, 9]]
+        self.assertEqual([is_safe_with_repair_linear(report) for report in reports],
+                         [True, False, False, True, True, True])
+
+    def test_linear_agrees(self):
+        rng = random.Random(2)
+        for _ in range(20000):
+            report = random_report(rng)
+            self.assertEqual(is_safe_with_repair_linear(report), is_safe_with_repair(report), report)
+
+    def test_batch_agrees(self):
+        rng = random.Random(24)
+        reports = [random_report(rng) for _ in range(20000)]
+        safe, repairable = safety_masks(*pack_reports(reports))
+        self.assertEqual(safe.tolist(), [is_safe(report) for report in reports])
+        self.assertEqual(repairable.tolist(), [is_safe_with_repair(report) for report in reports])
+
+    def test_batch_short_reports(self):
+        for reports in [[], [[]], [[1]], [[1], [4, 4]], [[1, 2], [3, 9], []]]:
+            safe, repairable = safety_masks(*pack_reports(reports))
+            self.assertEqual(safe.tolist(), [is_safe(report) for report in reports])
+            self.assertEqual(repairable.tolist(), [is_safe_with_repair(report) for report in reports])
+
+class StreamTests(unittest.TestCase):
+    def test_failure_reason(self):
+        self.assertEqual([failure_reason(report) for report in [[1, 2, 3], [1, 1], [1, 5], [1, 2, 1]]],
+                         [None, 'unchanged', 'too large', 'turned'])
+        rng = random.Random(25)
+        for _ in range(5000):
+            report = random_report(rng)
+            self.assertEqual(failure_reason(report) is None, is_safe(report), report)
+
+    def test_chunked_counts(self):
+        rng = random.Random(5)
+        reports = [random_report(rng) for _ in range(500)]
+        data = ''.join(' '.join(map(str, report)) + '\n' for report in reports).encode()
+        expected = {'safe': sum(is_safe(report) for report in reports),
+                    'repaired': sum(is_safe_with_repair(report) and not is_safe(report) for report in reports),
+                    'unsafe': sum(not is_safe_with_repair(report) for report in reports)}
+        for chunk_size in [1, 7, 64, len(data)]:
+            chunks = list(read_chunks(io.BytesIO(data), chunk_size))
+            self.assertEqual(b''.join(chunks), data)
+            counts = sum((check_chunk(chunk) for chunk in chunks), start=Counter())
+            self.assertEqual(dict(counts), {name: n for name, n in expected.items() if n})
+
+    def test_vectorized_chunk_agrees(self):
+        rng = random.Random(250)
+        for _ in range(2000):
+            reports = [random_report(rng) for _ in range(rng.randint(1, 8))]
+            chunk = ''.join(' '.join(map(str, report)) + '\n' for report in reports).encode()
+            if rng.random() < 0.3:
+                chunk = chunk[:-1] or b'\n'
+            levels, lengths = parse_reports(chunk)
+            self.assertEqual(lengths.tolist(), [len(line.split()) for line in chunk.decode().splitlines()], chunk)
+            self.assertEqual(day2_vectorized.check_chunk(chunk, True), check_chunk(chunk, True), chunk)
+
+    def test_workers_agree(self):
+        filename = os.path.join(os.path.dirname(__file__), 'example.txt')
+        expected = stream_safety_counts(filename, reasons=True)
+        self.assertEqual(expected['safe'] + expected['repaired'], 7)
+        for check in [check_chunk, day2_vectorized.check_chunk]:
+            for chunk_size in [1, 16, 1 << 20]:
+                self.assertEqual(stream_safety_counts(filename, 2, chunk_size, True, check), expected, (check, chunk_size))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+from collections import Counter
+import numpy as np
+from day2 import Report, FailureReason
+import sys
+import instrument
+
+def pack_reports(reports: list[Report]) -> tuple[np.ndarray, np.ndarray]:
+    """One row per report, padded out to the longest with zeros, and the
+    length of each report."""
+    lengths = np.array([len(report) for report in reports], dtype=np.int64)
+    levels = np.zeros((len(reports), max(lengths, default=0)), dtype=np.int64)
+    for row, report in enumerate(reports):
+        levels[row, :len(report)] = report
+    return levels, lengths
+
+def safety_masks(levels: np.ndarray, lengths: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Masks of which packed reports are safe, and which are safe with at most
+    one repair. Runs the scan of `day2.is_safe_with_repair_linear` over every
+    report at once, one column of levels at a time. Padding never changes the
+    state reached at the end of a report."""
+    count, width = levels.shape
+    if width < 2:
+        return np.ones(count, dtype=bool), np.ones(count, dtype=bool)
+    steps = np.diff(levels, axis=1)
+    skips = levels[:, 2:] - levels[:, :-2]
+    step_up, step_down = (steps >= 1) & (steps <= 3), (steps >= -3) & (steps <= -1)
+    skip_up, skip_down = (skips >= 1) & (skips <= 3), (skips >= -3) & (skips <= -1)
+
+    up_before, up, up_repaired = np.ones(count, dtype=bool), step_up[:, 0], np.ones(count, dtype=bool)
+    down_before, down, down_repaired = np.ones(count, dtype=bool), step_down[:, 0], np.ones(count, dtype=bool)
+    for i in range(2, width):
+        active = i < lengths
+        up_before, up, up_repaired = (
+            np.where(active, up, up_before),
+            np.where(active, up & step_up[:, i - 1], up),
+            np.where(active, (up_repaired & step_up[:, i - 1]) | (up_before & skip_up[:, i - 2]), up_repaired))
+        down_before, down, down_repaired = (
+            np.where(active, down, down_before),
+            np.where(active, down & step_down[:, i - 1], down),
+            np.where(active, (down_repaired & step_down[:, i - 1]) | (down_before & skip_down[:, i - 2]), down_repaired))
+    safe = (lengths < 2) | up | down
+    repairable = (lengths <= 2) | up | up_before | up_repaired | down | down_before | down_repaired
+    return safe, repairable
+
+def parse_reports(chunk: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """Packs the reports in a chunk of whole lines the same way as
+    `pack_reports`, without splitting the chunk into lines or levels in
+    Python. Each level is found as a run of digit bytes, optionally after a
+    minus sign, and its value is summed from its digits and their place."""
+    data = np.frombuffer(chunk, dtype=np.uint8)
+    line_count = int((data == ord('\n')).sum()) + (0 if chunk.endswith(b'\n') or len(chunk) == 0 else 1)
+    digits = (data >= ord('0')) & (data <= ord('9'))
+    before = np.concatenate(([False], digits[:-1]))
+    after = np.concatenate((digits[1:], [False]))
+    starts, ends = np.flatnonzero(digits & ~before), np.flatnonzero(digits & ~after)
+
+    # The level each digit belongs to, and the power of ten it stands for.
+    positions = np.flatnonzero(digits)
+    level_idx = np.cumsum(digits & ~before)[positions] - 1
+    places = np.power(10, ends[level_idx] - positions, dtype=np.int64)
+    values = np.bincount(level_idx, weights=(data[positions] - ord('0')) * places, minlength=len(starts)).astype(np.int64)
+    negative = np.zeros(len(starts), dtype=bool)
+    negative[starts > 0] = data[starts[starts > 0] - 1] == ord('-')
+    values[negative] *= -1
+
+    # Each level's report is the number of line ends before it.
+    report_idx = np.cumsum(data == ord('\n'))[starts]
+    lengths = np.bincount(report_idx, minlength=line_count).astype(np.int64)
+    levels = np.zeros((line_count, max(lengths, default=0)), dtype=np.int64)
+    columns = np.arange(len(starts)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    levels[report_idx, columns] = values
+    return levels, lengths
+
+def failure_reasons(levels: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """The index into `FailureReason` of why each packed report fails, as
+    `day2.failure_reason` finds it, or -1 for a safe report."""
+    count, width = levels.shape
+    if width < 2:
+        return np.full(count, -1)
+    steps = np.diff(levels, axis=1)
+    # A step only turns once the steps before it are all allowed, and so all
+    # go the same way as the one just before.
+    turned = np.concatenate((np.zeros((count, 1), dtype=bool), np.sign(steps[:, 1:]) != np.sign(steps[:, :-1])), axis=1)
+    kinds = np.select([steps == 0, np.abs(steps) > 3, turned], [0, 1, 2], -1)
+    kinds[np.arange(width - 1) >= (lengths[:, None] - 1)] = -1
+    failing = kinds >= 0
+    first = failing.argmax(axis=1)
+    return np.where(failing.any(axis=1), kinds[np.arange(count), first], -1)
+
+def check_chunk(chunk: bytes, reasons: bool = False) -> Counter[str]:
+    """Same as `day2.check_chunk`, checking every report in the chunk at
+    once."""
+    levels, lengths = parse_reports(chunk)
+    safe, repairable = safety_masks(levels, lengths)
+    counts = Counter({'safe': int(safe.sum()),
+                      'repaired': int((repairable & ~safe).sum()),
+                      'unsafe': int((~repairable).sum())})
+    if reasons:
+        reason_counts = np.bincount(failure_reasons(levels, lengths) + 1, minlength=len(FailureReason.__args__) + 1)
+        counts.update(dict(zip(FailureReason.__args__, reason_counts[1:].tolist())))
+    return +counts
+
+if __name__ == '__main__':
+    import argparse
+    from more_itertools import chunked
+    from day2 import load_reports
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d02')
+    parser.add_argument('filename')
+    parser.add_argument('--batch-size', type=int, default=100000)
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
+    args = parser.parse_args()
+
+    instrument.enable(profile=args.profile is not None)
+
+    safe_reports = 0
+    for reports in instrument.metered('batches', chunked(load_reports(args.filename), args.batch_size)):
+        with instrument.timer('pack'):
+            packed = pack_reports(reports)
+        with instrument.timer('check'):
+            _, repairable = safety_masks(*packed)
+        instrument.count('reports', len(reports))
+        safe_reports += int(repairable.sum())
+    print("Safe reports: ", safe_reports)
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
@@ -1,5 +1,11 @@
 from typing import Literal, Generator
+import mmap
+import os
 import re
+import sys
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
+import instrument
 
 def tokenize(line: str) -> list[str]:
     """Given a line of input, find all occurrences of valid tokens. They must
@@ -26,6 +32,41 @@ def load_instructions(filename: str) -> Generator[Instruction, None, None]:
             for token in tokenize(line):
                 yield parse(token)
 
+# Every token in one pass over bytes, capturing both operands of a mul and
+# whether a do is negated.
+INSTRUCTION_PATTERN = re.compile(rb"mul\(([0-9]{1,3}),([0-9]{1,3})\)|do(n't)?\(\)")
+
+def scan_instructions(filename: str) -> Generator[Instruction, None, None]:
+    """Memory-map the file and yield its instructions straight from the
+    matches of `INSTRUCTION_PATTERN`. Lines play no part, so memory use does
+    not depend on how long they are. Operands are ASCII digits only."""
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for match in INSTRUCTION_PATTERN.finditer(buffer):
+                a, b, nt = match.groups()
+                if a is not None:
+                    yield ('mul', int(a), int(b))
+                else:
+                    yield "don't" if nt else 'do'
+
+def scan_total(filename: str) -> int:
+    """Like folding `next_state` over `scan_instructions`, without building any
+    instructions."""
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return 0
+        total, enabled = 0, True
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for match in INSTRUCTION_PATTERN.finditer(buffer):
+                a, b, nt = match.groups()
+                if a is None:
+                    enabled = not nt
+                elif enabled:
+                    total += int(a) * int(b)
+        return total
+
 State = tuple[int, bool]
 
 def initial_state() -> State:
@@ -50,12 +91,24 @@ if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(prog='AOC2024-d03')
     parser.add_argument('filename')
+    parser.add_argument('--mmap', action="store_true", help="scan the whole file as bytes")
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
     args = parser.parse_args()
 
-    # From the initial state, run every instruction in sequence.
-    state = initial_state()
-    for instruction in load_instructions(args.filename):
-        state = next_state(state, instruction)
+    instrument.enable(profile=args.profile is not None)
+
+    if args.mmap:
+        with instrument.timer('scan'):
+            total = scan_total(args.filename)
+        print("Total: ", total)
+    else:
+        # From the initial state, run every instruction in sequence.
+        state = initial_state()
+        with instrument.timer('execute'):
+            for instruction in instrument.metered('load', load_instructions(args.filename)):
+                state = next_state(state, instruction)
     
-    total, _ = state
-    print("Total: ", total)
+        total, _ = state
+        print("Total: ", total)
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
@@ -0,0 +1,114 @@
+from typing import Iterable
+from functools import reduce
+import mmap
+import os
+import sys
+from day3 import INSTRUCTION_PATTERN, State
+import instrument
+from parallel import fork_pool
+
+# Longest token, `mul(123,456)`. A token that starts in a chunk never ends more
+# than this many bytes past the chunk's end.
+MAX_TOKEN_LENGTH = 12
+
+# The effect of a chunk of input on the state: the state after the chunk when
+# entered enabled, and when entered disabled, each counted from a total of 0.
+type Summary = tuple[State, State]
+
+IDENTITY: Summary = ((0, True), (0, False))
+
+def entered(summary: Summary, enabled: bool) -> State:
+    """The state after a chunk that was entered with the given enable flag."""
+    return summary[0] if enabled else summary[1]
+
+def apply(state: State, summary: Summary) -> State:
+    """Run a summarized chunk from the given state."""
+    total, enabled = state
+    chunk_total, exit_enabled = entered(summary, enabled)
+    return (total + chunk_total, exit_enabled)
+
+def combine(first: Summary, second: Summary) -> Summary:
+    """Summarize two adjacent chunks as one. This is associative, with
+    `IDENTITY` as its identity, so summaries can be combined in any grouping."""
+    return (apply(first[0], second), apply(first[1], second))
+
+def summarize(buffer: bytes | mmap.mmap, start: int, end: int) -> Summary:
+    """Summarize the tokens that start within `buffer[start:end]`. Tokens may
+    run past `end`, so the buffer is read up to `MAX_TOKEN_LENGTH` bytes beyond
+    it. Tokens never overlap, so every token is counted in exactly one chunk."""
+    total, enabled = 0, True
+    # Total so far when the first do()/don't() is met. Until then, only the
+    # chunk entered enabled is counting; after it, both entries agree.
+    prefix_total = None
+    endpos = min(len(buffer), end + MAX_TOKEN_LENGTH - 1)
+    for match in INSTRUCTION_PATTERN.finditer(buffer, start, endpos):
+        if match.start() >= end:
+            break
+        a, b, nt = match.groups()
+        if a is None:
+            if prefix_total is None:
+                prefix_total = total
+            enabled = not nt
+        elif enabled:
+            total += int(a) * int(b)
+    if prefix_total is None:
+        return ((total, True), (0, False))
+    return ((total, enabled), (total - prefix_total, enabled))
+
+def chunk_bounds(size: int, chunk_size: int) -> list[tuple[int, int]]:
+    """Byte offsets splitting a file of `size` bytes into chunks."""
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+def total(summaries: Iterable[Summary]) -> int:
+    """Combine the summaries of consecutive chunks, in order, and run them from
+    the initial state."""
+    total, _ = entered(reduce(combine, summaries, IDENTITY), True)
+    return total
+
+# Each worker process maps the file itself and summarizes chunks by offset, so
+# only the offsets and summaries cross between processes.
+worker_buffer = None
+
+def init_worker(filename: str):
+    global worker_buffer
+    with open(filename, 'rb') as file:
+        worker_buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def summarize_chunk(bounds: tuple[int, int]) -> Summary:
+    start, end = bounds
+    return summarize(worker_buffer, start, end)
+
+def parallel_total(filename: str, workers: int = os.cpu_count() or 1, chunk_size: int = 1 << 24) -> int:
+    """Evaluate the file in chunks of `chunk_size` bytes across a pool of
+    worker processes. The result is identical to running every instruction
+    in sequence."""
+    size = os.path.getsize(filename)
+    if size == 0:
+        return 0
+    bounds = chunk_bounds(size, chunk_size)
+    instrument.count('chunks', len(bounds))
+    if workers <= 1:
+        with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return total(summarize(buffer, start, end) for start, end in bounds)
+
+    with fork_pool(workers, init_worker, (filename,)) as pool:
+        # imap keeps the summaries in file order, which combine relies on.
+        return total(pool.imap(summarize_chunk, bounds))
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d03')
+    parser.add_argument('filename')
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', '-c', type=int, default=1 << 24, help="bytes per chunk")
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
+    args = parser.parse_args()
+
+    instrument.enable(profile=args.profile is not None)
+
+    with instrument.timer('evaluate'):
+        result = parallel_total(args.filename, args.workers, args.chunk_size)
+    print("Total: ", result)
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
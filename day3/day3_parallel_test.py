@@ -0,0 +1,59 @@
+import os
+import random
+import tempfile
+import unittest
+import day3_parallel
+from functools import reduce
+from day3 import initial_state, load_instructions, next_state
+from day3_parallel import IDENTITY, chunk_bounds, combine, parallel_total, summarize, total
+
+FRAGMENTS = ['mul(', 'mul', 'do()', "don't()", 'do', "don't", '(', ')', ',',
+             '1', '23', '456', '7890', ' ', 'x', '\n']
+
+def sequential_total(filename: str) -> int:
+    total, _ = reduce(next_state, load_instructions(filename), initial_state())
+    return total
+
+class ParallelTests(unittest.TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix='.txt')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def write(self, text: str):
+        with open(self.filename, 'w') as file:
+            file.write(text)
+
+    def test_combine_is_associative(self):
+        data = b"mul(2,3)don't()mul(4,5)do()mul(6,7)mul(8,9)don't()"
+        summaries = [summarize(data, start, end) for start, end in chunk_bounds(len(data), 7)]
+        self.assertEqual(combine(IDENTITY, summaries[0]), summaries[0])
+        self.assertEqual(combine(summaries[0], IDENTITY), summaries[0])
+        left = combine(combine(summaries[0], summaries[1]), summaries[2])
+        right = combine(summaries[0], combine(summaries[1], summaries[2]))
+        self.assertEqual(left, right)
+        self.assertEqual(total(summaries), 2 * 3 + 6 * 7 + 8 * 9)
+
+    def test_straddling_tokens(self):
+        data = b"xmul(123,456)do()don't()mul(1,1)"
+        for chunk_size in range(1, len(data) + 1):
+            summaries = [summarize(data, start, end) for start, end in chunk_bounds(len(data), chunk_size)]
+            self.assertEqual(total(summaries), 123 * 456, chunk_size)
+
+    def test_agrees_with_sequential(self):
+        rng = random.Random(3)
+        for _ in range(100):
+            self.write(''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 300))))
+            expected = sequential_total(self.filename)
+            chunk_size = rng.randint(1, 64)
+            self.assertEqual(parallel_total(self.filename, 1, chunk_size), expected)
+        self.assertEqual(parallel_total(self.filename, 2, 16), expected)
+
+    def test_serial_leaves_no_mapping_open(self):
+        parallel_total(self.filename, 1, 16)
+        self.assertIsNone(day3_parallel.worker_buffer)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,35 +1,57 @@
-from typing import Iterable, Literal, Generator
+from typing import BinaryIO, Iterable, Literal, Generator
 from enum import Enum
+import re
 from more_itertools import consume
 from util import sliding_window
+import os
+import sys
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
+import instrument
+from instrument import logd
 
-def logd(*_):
-    pass
+# No delimiter is a prefix of another or ends in the same byte as another, so
+# the leftmost match is always the one that ends first.
+DELIMITER_PATTERN = re.compile(rb"mul|do|n't|[(),]")
 
-def tokenize(source: bytes) -> Generator[str, None, None]:
-    delimiters = [b'mul', b'do', b"n't", b'(', b')', b',']
-    buffer = bytearray()
+# Bytes kept back at the end of each chunk, as they may be the start of a
+# delimiter that ends in the next chunk.
+DELIMITER_OVERLAP = 2
+
+def tokenize(source: BinaryIO, chunk_size: int = 1 << 16) -> Generator[str, None, None]:
+    # The text since the last delimiter is kept as a list of parts and joined
+    # only once the token ends, so a long run without delimiters is not copied
+    # again with every chunk.
+    pending: list[bytes] = []
+    tail = b''
     while True:
-        next_byte = source.read(1)
-        logd(f"\033[48;5;53mtokenizing:\033[0m {repr(next_byte)}")
-        buffer.extend(next_byte)
-        for delimiter in delimiters:
-            if buffer.endswith(delimiter):
-                buffer_str = buffer.removesuffix(delimiter).decode()
-                if len(buffer_str) > 0:
-                    yield buffer_str
-                yield delimiter.decode()
-                buffer.clear()
-        if len(next_byte) == 0:
-            if len(buffer) > 0:
-                yield buffer.decode()
+        chunk = source.read(chunk_size)
+        logd("\033[48;5;53mtokenizing:\033[0m %d bytes", len(chunk))
+        data = tail + chunk if tail else chunk
+        cut = 0
+        for match in DELIMITER_PATTERN.finditer(data):
+            pending.append(data[cut:match.start()])
+            token = b''.join(pending)
+            if len(token) > 0:
+                yield token.decode()
+            pending.clear()
+            yield match.group().decode()
+            cut = match.end()
+        rest = data[cut:]
+        if len(chunk) == 0:
+            pending.append(rest)
+            token = b''.join(pending)
+            if len(token) > 0:
+                yield token.decode()
             return
+        pending.append(rest[:-DELIMITER_OVERLAP])
+        tail = rest[-DELIMITER_OVERLAP:]
 
 LexCode = Enum('LexCode', ['MUL', 'DO', 'NT', 'OP', 'CP', 'COMMA'])
 
 def lex(tokens: Iterable[str]) -> Generator[LexCode | int | str, None, None]:
     for token in tokens:
-        logd(f"\033[48;5;60m    lexing:\033[0m {repr(token)}")
+        logd("\033[48;5;60m    lexing:\033[0m %r", token)
         match token:
             case 'mul': yield LexCode.MUL
             case 'do': yield LexCode.DO
@@ -46,7 +68,7 @@ type Instruction = tuple[Literal[OpCode.MUL], int, int] | Literal[OpCode.DO, OpC
 def parse(lexes: Iterable[LexCode | int | str]) -> Generator[Instruction, None, None]:
     window = sliding_window(lexes, 6)
     for items in window:
-        logd(f"\033[48;5;24m   parsing:\033[0m {repr(items)}")
+        logd("\033[48;5;24m   parsing:\033[0m %r", items)
         match items:
             case [LexCode.MUL, LexCode.OP, int(x), LexCode.COMMA, int(y), LexCode.CP, *_]:
                 yield (OpCode.MUL, x, y)
@@ -61,7 +83,7 @@ def parse(lexes: Iterable[LexCode | int | str]) -> Generator[Instruction, None,
 def execute(instructions: Iterable[Instruction]) -> int:
     total, enabled = 0, True
     for instruction in instructions:
-        logd(f"\033[48;5;18m executing:\033[0m {repr(instruction)}")
+        logd("\033[48;5;18m executing:\033[0m %r", instruction)
         match instruction:
             case (OpCode.MUL, a, b) if enabled:
                 total += a * b
@@ -71,21 +93,84 @@ def execute(instructions: Iterable[Instruction]) -> int:
                 enabled = False
     return total
 
+# The whole grammar fused into one compiled pattern. 'mul' and 'do' can never
+# overlap another delimiter, so every occurrence of them starts a token, and an
+# operand is a digit segment bounded by '(' / ',' / ')'. Non-ASCII bytes are
+# admitted into operands so that Unicode digits lex exactly as in `lex`.
+OPERAND = rb"[0-9\x80-\xff]+"
+INSTRUCTION_PATTERN = re.compile(rb"mul\((" + OPERAND + rb"),(" + OPERAND + rb")\)|do(n't)?\(\)")
+# Any unfinished instruction at the very end of a chunk.
+PARTIAL_PATTERN = re.compile(rb"(?:m(?:u(?:l(?:\((?:" + OPERAND + rb"(?:,(?:" + OPERAND + rb")?)?)?)?)?)?"
+                             rb"|d(?:o(?:\(|n(?:'(?:t\(?)?)?)?)?)\Z")
+
+def operand(segment: bytes) -> int | None:
+    if segment.isdigit():
+        return int(segment)
+    text = segment.decode()
+    return int(text) if text.isdigit() else None
+
+def scan_matches(source: BinaryIO, chunk_size: int = 1 << 16) -> Generator[re.Match, None, None]:
+    carry = b''
+    while True:
+        chunk = source.read(chunk_size)
+        data = carry + chunk if carry else chunk
+        cut = 0
+        for match in INSTRUCTION_PATTERN.finditer(data):
+            yield match
+            cut = match.end()
+        if len(chunk) == 0:
+            return
+        partial = PARTIAL_PATTERN.search(data, cut)
+        carry = data[partial.start():] if partial else b''
+
+# Bytes straight to instructions, equivalent to parse(lex(tokenize(source))).
+def scan(source: BinaryIO, chunk_size: int = 1 << 16) -> Generator[Instruction, None, None]:
+    for match in scan_matches(source, chunk_size):
+        x, y, nt = match.groups()
+        if x is None:
+            yield OpCode.DONT if nt else OpCode.DO
+            continue
+        x, y = operand(x), operand(y)
+        if x is not None and y is not None:
+            yield (OpCode.MUL, x, y)
+
+# Bytes straight to the total, equivalent to execute(scan(source)).
+def scan_total(source: BinaryIO, chunk_size: int = 1 << 16) -> int:
+    total, enabled = 0, True
+    for match in scan_matches(source, chunk_size):
+        x, y, nt = match.groups()
+        if x is None:
+            enabled = not nt
+        elif enabled:
+            x, y = operand(x), operand(y)
+            if x is not None and y is not None:
+                total += x * y
+    return total
+
 if __name__ == '__main__':
     import argparse
-    import sys
 
     parser = argparse.ArgumentParser(prog='AOC2024-d03')
     parser.add_argument('filename')
     parser.add_argument('--debug', '-d', action="store_true")
+    parser.add_argument('--fused', action="store_true", help="scan with the single compiled pattern")
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
     args = parser.parse_args()
 
-    if (args.debug):
-        def logd(*args):
-            print(*args, file=sys.stderr)
+    instrument.enable(trace=args.debug, profile=args.profile is not None)
 
     # From the initial state, run every instruction in sequence.
     with open(args.filename, 'rb') as file:
-        total = execute(parse(lex(tokenize(file))))
+        if args.fused:
+            with instrument.timer('scan'):
+                total = scan_total(file)
+        else:
+            tokens = instrument.metered('tokenize', tokenize(file))
+            lexes = instrument.metered('lex', lex(tokens))
+            instructions = instrument.metered('parse', parse(lexes))
+            with instrument.timer('execute'):
+                total = execute(instructions)
     
     print("Total: ", total)
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
@@ -0,0 +1,72 @@
+import io
+import random
+import unittest
+from typing import Generator
+from day3_parser import tokenize, lex, parse, execute, scan, scan_total, OpCode
+
+# Fragments that are likely to form, or nearly form, instructions when mixed.
+FRAGMENTS = ['mul', 'mu', 'do', "don't", "n't", 'do()', "don't()", '(', ')', ',',
+             '1', '23', '456', '7890', '0', ' ', 'x', 'm', 'd', '!', '\n', '٣', 'é']
+
+def corrupted(rng: random.Random, length: int) -> bytes:
+    return ''.join(rng.choice(FRAGMENTS) for _ in range(length)).encode()
+
+def tokenize_bytewise(source: io.BytesIO) -> Generator[str, None, None]:
+    # The tokenizer as it was before reading in chunks, kept as the reference.
+    delimiters = [b'mul', b'do', b"n't", b'(', b')', b',']
+    buffer = bytearray()
+    while True:
+        next_byte = source.read(1)
+        buffer.extend(next_byte)
+        for delimiter in delimiters:
+            if buffer.endswith(delimiter):
+                buffer_str = buffer.removesuffix(delimiter).decode()
+                if len(buffer_str) > 0:
+                    yield buffer_str
+                yield delimiter.decode()
+                buffer.clear()
+        if len(next_byte) == 0:
+            if len(buffer) > 0:
+                yield buffer.decode()
+            return
+
+def layered(data: bytes, chunk_size: int = 1 << 16) -> list:
+    return list(parse(lex(tokenize(io.BytesIO(data), chunk_size))))
+
+class TokenizeTests(unittest.TestCase):
+    def test_agrees_with_bytewise_tokenizer(self):
+        rng = random.Random(19)
+        for _ in range(300):
+            data = corrupted(rng, rng.randint(0, 200))
+            expected = list(tokenize_bytewise(io.BytesIO(data)))
+            for chunk_size in [1, 2, 3, 5, 16, 1 << 16]:
+                self.assertEqual(list(tokenize(io.BytesIO(data), chunk_size)), expected, (data, chunk_size))
+
+    def test_long_run_without_delimiters(self):
+        data = b'x' * 100000 + b'mul(1,2)' + 'é'.encode() * 50000
+        self.assertEqual(list(tokenize(io.BytesIO(data), 7)),
+                         ['x' * 100000, 'mul', '(', '1', ',', '2', ')', 'é' * 50000])
+
+class ScanTests(unittest.TestCase):
+    def test_example(self):
+        data = b"xmul(2,4)&mul[3,7]!^don't()_mul(5,5)+mul(32,64](mul(11,8)undo()?mul(8,5))"
+        self.assertEqual(list(scan(io.BytesIO(data))),
+                         [(OpCode.MUL, 2, 4), OpCode.DONT, (OpCode.MUL, 5, 5),
+                          (OpCode.MUL, 11, 8), OpCode.DO, (OpCode.MUL, 8, 5)])
+        self.assertEqual(scan_total(io.BytesIO(data)), 48)
+
+    def test_unicode_operands(self):
+        data = 'mul(٣,2)mul(1é,2)'.encode()
+        self.assertEqual(list(scan(io.BytesIO(data))), layered(data))
+
+    def test_agrees_with_layered_pipeline(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            data = corrupted(rng, rng.randint(0, 200))
+            chunk_size = rng.randint(1, 32)
+            expected = layered(data)
+            self.assertEqual(list(scan(io.BytesIO(data), chunk_size)), expected, data)
+            self.assertEqual(scan_total(io.BytesIO(data), chunk_size), execute(expected), data)
+
+if __name__ == '__main__':
+    unittest.main()
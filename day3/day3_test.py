@@ -0,0 +1,30 @@
+import os
+import random
+import tempfile
+import unittest
+from functools import reduce
+from day3 import initial_state, load_instructions, next_state, scan_instructions, scan_total
+
+FRAGMENTS = ['mul(', 'mul', 'do()', "don't()", 'do', "don't", '(', ')', ',',
+             '1', '23', '456', '7890', ' ', 'x', '\n']
+
+class ScanTests(unittest.TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix='.txt')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_agrees_with_load_instructions(self):
+        rng = random.Random(22)
+        for _ in range(200):
+            with open(self.filename, 'w') as file:
+                file.write(''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 300))))
+            instructions = list(load_instructions(self.filename))
+            self.assertEqual(list(scan_instructions(self.filename)), instructions)
+            total, _ = reduce(next_state, instructions, initial_state())
+            self.assertEqual(scan_total(self.filename), total)
+
+if __name__ == '__main__':
+    unittest.main()
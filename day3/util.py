@@ -7,7 +7,9 @@ def sliding_window(iterable, n):
     "Collect data into overlapping fixed-length chunks or blocks."
     # sliding_window('ABCDEFG', 4) → ABCD BCDE CDEF DEFG EFG FG G ()
     iterator = iter(iterable)
-    window = collections.deque(islice(iterator, n - 1), maxlen=n)
+    window = collections.deque(islice(iterator, n), maxlen=n)
+    if len(window) > 0:
+        yield tuple(window)
     for x in iterator:
         window.append(x)
         yield tuple(window)
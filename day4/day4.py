@@ -1,4 +1,9 @@
 from typing import Callable
+import os
+import sys
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
+import instrument
 
 def stencil_horizontal(lines: list[str], top: int, left: int) -> str:
     """Isolates a length 4 string going right from top/left."""
@@ -53,18 +58,24 @@ if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(prog='AOC2024-d03')
     parser.add_argument('filename')
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
     args = parser.parse_args()
 
-    lines = load_lines(args.filename)
+    instrument.enable(profile=args.profile is not None)
+
+    with instrument.timer('load'):
+        lines = load_lines(args.filename)
 
     stencils = [(stencil_horizontal, 1, 4),
                 (stencil_vertical, 4, 1),
                 (stencil_slash, 4, 4),
                 (stencil_backslash, 4, 4)]
-    candidates = [c
-                  for stencil, height, width in stencils
-                  for c in apply_stencil(lines, stencil, height, width)]
-    xmas_count = candidates.count('XMAS') + candidates.count('SAMX')
+    with instrument.timer('xmas'):
+        candidates = [c
+                      for stencil, height, width in stencils
+                      for c in apply_stencil(lines, stencil, height, width)]
+        xmas_count = candidates.count('XMAS') + candidates.count('SAMX')
+    instrument.count('candidates', len(candidates))
     print(f"XMAS count: {xmas_count}")
 
     # Stencil gives results in a Z shape. Valid X-MASes are:
@@ -73,7 +84,11 @@ if __name__ == '__main__':
     #  S S    S M    M M    M S
     #   =      =      =      =
     # MMASS  SMASM  SSAMM  MSAMS
-    crosses = apply_stencil(lines, stencil_x, 3, 3)
-    crossmas_count = (crosses.count('MMASS') + crosses.count('SMASM') +
-                      crosses.count('SSAMM') + crosses.count('MSAMS'))
+    with instrument.timer('crossmas'):
+        crosses = apply_stencil(lines, stencil_x, 3, 3)
+        crossmas_count = (crosses.count('MMASS') + crosses.count('SMASM') +
+                          crosses.count('SSAMM') + crosses.count('MSAMS'))
+    instrument.count('candidates', len(crosses))
     print(f"Crossmas count: {crossmas_count}")
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
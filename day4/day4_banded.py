@@ -0,0 +1,89 @@
+from typing import Callable, Generator
+import mmap
+import sys
+from day4 import (stencil_horizontal, stencil_vertical, stencil_slash,
+                  stencil_backslash, stencil_x, apply_stencil)
+import instrument
+from parallel import fork_pool
+
+type StencilSpec = tuple[Callable[[list[str], int, int], str], int, int]
+
+# Each search sums the matches of its words over all of its stencils, as in
+# the day4 main block.
+SEARCHES: list[tuple[str, list[StencilSpec], list[str]]] = [
+    ('XMAS count',
+     [(stencil_horizontal, 1, 4), (stencil_vertical, 4, 1), (stencil_slash, 4, 4), (stencil_backslash, 4, 4)],
+     ['XMAS', 'SAMX']),
+    ('Crossmas count',
+     [(stencil_x, 3, 3)],
+     ['MMASS', 'SMASM', 'SSAMM', 'MSAMS']),
+]
+# Rows a band needs beyond its own, so that every stencil starting on one of
+# its rows fits inside it.
+OVERLAP = max(height for _, stencils, _ in SEARCHES for _, height, _ in stencils) - 1
+
+def read_rows(filename: str, first_row: int, row_count: int) -> list[str]:
+    """Reads a run of rows out of the memory-mapped grid file. Every row must
+    be the same length, so a row's position in the file is known without
+    reading the rows before it."""
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        stride = buffer.find(b'\n') + 1 or len(buffer)
+        chunk = buffer[first_row * stride:(first_row + row_count) * stride]
+    return [line.strip() for line in chunk.decode().splitlines() if len(line.strip()) > 0]
+
+def count_band(band: tuple[str, int, int]) -> list[int]:
+    """Counts the matches of each search whose stencil starts on one of the
+    band's own rows. The overlap rows after them are only read so that those
+    stencils fit, and are counted by the next band."""
+    filename, first_row, own_rows = band
+    lines = read_rows(filename, first_row, own_rows + OVERLAP)
+    counts = []
+    for _, stencils, words in SEARCHES:
+        count = 0
+        for stencil, height, width in stencils:
+            candidates = apply_stencil(lines[:own_rows + height - 1], stencil, height, width)
+            count += sum(candidates.count(word) for word in words)
+        counts.append(count)
+    return counts
+
+def bands(filename: str, band_rows: int) -> Generator[tuple[str, int, int], None, None]:
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        stride = buffer.find(b'\n') + 1 or len(buffer)
+        row_count = -(-len(buffer) // stride)
+    for first_row in range(0, row_count, band_rows):
+        yield filename, first_row, min(band_rows, row_count - first_row)
+
+def count_banded(filename: str, band_rows: int = 1000, workers: int = 1) -> list[int]:
+    """Counts every search over the grid one band of rows at a time, so memory
+    depends on the band size and not on the height of the grid. With more
+    than one worker the bands are counted in a process pool, each worker
+    reading its own bands from the file."""
+    totals = [0] * len(SEARCHES)
+    if workers <= 1:
+        for counts in map(count_band, instrument.metered('bands', bands(filename, band_rows))):
+            totals = [total + count for total, count in zip(totals, counts)]
+        return totals
+
+    with fork_pool(workers) as pool:
+        for counts in pool.imap_unordered(count_band, instrument.metered('bands', bands(filename, band_rows))):
+            totals = [total + count for total, count in zip(totals, counts)]
+    return totals
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d04')
+    parser.add_argument('filename')
+    parser.add_argument('--band-rows', '-b', type=int, default=1000)
+    parser.add_argument('--workers', '-w', type=int, default=1)
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
+    args = parser.parse_args()
+
+    instrument.enable(profile=args.profile is not None)
+
+    with instrument.timer('count'):
+        totals = count_banded(args.filename, args.band_rows, args.workers)
+    for (name, _, _), total in zip(SEARCHES, totals):
+        print(f"{name}: {total}")
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
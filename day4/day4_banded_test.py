@@ -0,0 +1,44 @@
+import os
+import random
+import tempfile
+import unittest
+from day4 import apply_stencil, load_lines
+from day4_banded import SEARCHES, count_banded
+
+def count_whole(lines: list[str]) -> list[int]:
+    return [sum(apply_stencil(lines, stencil, height, width).count(word)
+                for stencil, height, width in stencils for word in words)
+            for _, stencils, words in SEARCHES]
+
+class CountBandedTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_grid(self, lines: list[str]) -> str:
+        filename = os.path.join(self.directory.name, 'grid.txt')
+        with open(filename, 'w') as file:
+            file.write(''.join(line + '\n' for line in lines))
+        return filename
+
+    def test_every_band_size(self):
+        rng = random.Random(18)
+        for _ in range(30):
+            height, width = rng.randint(1, 12), rng.randint(1, 12)
+            lines = [''.join(rng.choice('XMAS') for _ in range(width)) for _ in range(height)]
+            filename = self.write_grid(lines)
+            expected = count_whole(lines)
+            for band_rows in range(1, height + 2):
+                self.assertEqual(count_banded(filename, band_rows), expected, (lines, band_rows))
+
+    def test_workers(self):
+        filename = os.path.join(os.path.dirname(__file__), 'example.txt')
+        expected = count_whole(load_lines(filename))
+        self.assertEqual(expected, [18, 9])
+        for band_rows in range(1, 12):
+            self.assertEqual(count_banded(filename, band_rows, workers=2), expected, band_rows)
+
+if __name__ == '__main__':
+    unittest.main()
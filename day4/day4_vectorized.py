@@ -0,0 +1,65 @@
+import numpy as np
+import os
+import sys
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
+import instrument
+
+type Stencil = list[tuple[int, int]]
+
+# The cells each stencil in day4 reads, as (top, left) offsets in the order
+# their letters are concatenated.
+HORIZONTAL: Stencil = [(0, 0), (0, 1), (0, 2), (0, 3)]
+VERTICAL: Stencil = [(0, 0), (1, 0), (2, 0), (3, 0)]
+SLASH: Stencil = [(3, 0), (2, 1), (1, 2), (0, 3)]
+BACKSLASH: Stencil = [(0, 0), (1, 1), (2, 2), (3, 3)]
+X: Stencil = [(0, 0), (0, 2), (1, 1), (2, 0), (2, 2)]
+
+def load_grid(filename: str) -> np.ndarray:
+    """Opens the file and reads the puzzle into a 2-D array of letter bytes."""
+    with open(filename, 'rb') as file:
+        lines = [line.strip() for line in file if len(line.strip()) > 0]
+    return np.frombuffer(b''.join(lines), dtype=np.uint8).reshape(len(lines), len(lines[0]))
+
+def count_matches(grid: np.ndarray, stencil: Stencil, word: str) -> int:
+    """Counts the positions where the stencil reads out the word. Rather than
+    building a string per position, each letter of the word is compared
+    against the whole grid shifted by that letter's offset, and the positions
+    where every comparison holds are counted."""
+    height = max(top for top, _ in stencil) + 1
+    width = max(left for _, left in stencil) + 1
+    rows, cols = grid.shape[0] - height + 1, grid.shape[1] - width + 1
+    if rows <= 0 or cols <= 0 or len(word) != len(stencil):
+        return 0
+    matches = np.ones((rows, cols), dtype=bool)
+    for (top, left), letter in zip(stencil, word.encode()):
+        matches &= grid[top:top + rows, left:left + cols] == letter
+    return int(matches.sum())
+
+def count_words(grid: np.ndarray, stencil: Stencil, words: list[str]) -> int:
+    return sum(count_matches(grid, stencil, word) for word in words)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d04')
+    parser.add_argument('filename')
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
+    args = parser.parse_args()
+
+    instrument.enable(profile=args.profile is not None)
+
+    with instrument.timer('load'):
+        grid = load_grid(args.filename)
+
+    with instrument.timer('xmas'):
+        xmas_count = sum(count_words(grid, stencil, ['XMAS', 'SAMX'])
+                         for stencil in [HORIZONTAL, VERTICAL, SLASH, BACKSLASH])
+    print(f"XMAS count: {xmas_count}")
+
+    # See day4 for the letter orders of the valid X-MASes.
+    with instrument.timer('crossmas'):
+        crossmas_count = count_words(grid, X, ['MMASS', 'SMASM', 'SSAMM', 'MSAMS'])
+    print(f"Crossmas count: {crossmas_count}")
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
@@ -0,0 +1,30 @@
+import random
+import unittest
+import numpy as np
+from day4 import apply_stencil, stencil_horizontal, stencil_vertical, stencil_slash, stencil_backslash, stencil_x
+from day4_vectorized import HORIZONTAL, VERTICAL, SLASH, BACKSLASH, X, count_matches
+
+STENCILS = [(HORIZONTAL, stencil_horizontal, 1, 4),
+            (VERTICAL, stencil_vertical, 4, 1),
+            (SLASH, stencil_slash, 4, 4),
+            (BACKSLASH, stencil_backslash, 4, 4),
+            (X, stencil_x, 3, 3)]
+
+def to_grid(lines: list[str]) -> np.ndarray:
+    return np.frombuffer(''.join(lines).encode(), dtype=np.uint8).reshape(len(lines), len(lines[0]))
+
+class CountMatchesTests(unittest.TestCase):
+    def test_agrees_with_apply_stencil(self):
+        rng = random.Random(16)
+        for _ in range(200):
+            height, width = rng.randint(1, 9), rng.randint(1, 9)
+            lines = [''.join(rng.choice('XMAS') for _ in range(width)) for _ in range(height)]
+            grid = to_grid(lines)
+            for stencil, stencil_function, stencil_height, stencil_width in STENCILS:
+                found = apply_stencil(lines, stencil_function, stencil_height, stencil_width)
+                words = set(found) | {''.join(rng.choice('XMAS') for _ in stencil)}
+                for word in words:
+                    self.assertEqual(count_matches(grid, stencil, word), found.count(word), (lines, word))
+
+if __name__ == '__main__':
+    unittest.main()
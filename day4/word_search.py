@@ -0,0 +1,157 @@
+from typing import Generator
+from collections import deque
+
+type Position = tuple[int, int]
+type Match = tuple[str, Position, str]
+
+# Directions a line of the grid can be read in, as (top, left) steps. Each
+# line is read one way; words are also searched for reversed to cover the
+# opposite direction.
+DIRECTIONS = {'E':(0, 1), 'S':(1, 0), 'SE':(1, 1), 'NE':(-1, 1)}
+OPPOSITES = {'E':'W', 'S':'N', 'SE':'NW', 'NE':'SW'}
+
+class Automaton(object):
+    """An Aho-Corasick automaton, which finds every occurrence of any of a set
+    of patterns in a single pass over a text."""
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = patterns
+        self.goto: list[dict[str, int]] = [{}]
+        self.outputs: list[list[int]] = [[]]
+        for pattern_idx, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.outputs.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.outputs[state].append(pattern_idx)
+
+        # Breadth-first, so every state's failure link is set before those of
+        # the states below it.
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def search(self, text: str) -> Generator[tuple[int, int], None, None]:
+        """Yields (end index, pattern index) for every occurrence of a pattern
+        in the text, where the end index is that of the pattern's last
+        character."""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for idx, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_idx in outputs[state]:
+                yield idx, pattern_idx
+
+def grid_lines(lines: list[str]) -> Generator[tuple[str, Position, str], None, None]:
+    """Yields every row, column, diagonal and anti-diagonal of the grid as a
+    string, with the position of its first character and its direction."""
+    height, width = len(lines), len(lines[0])
+    starts = {'E': [(top, 0) for top in range(height)],
+              'S': [(0, left) for left in range(width)],
+              'SE': [(top, 0) for top in range(height)] + [(0, left) for left in range(1, width)],
+              'NE': [(top, 0) for top in range(height)] + [(height - 1, left) for left in range(1, width)]}
+    for direction, (dTop, dLeft) in DIRECTIONS.items():
+        for top, left in starts[direction]:
+            chars = []
+            pos_top, pos_left = top, left
+            while 0 <= pos_top < height and 0 <= pos_left < width:
+                chars.append(lines[pos_top][pos_left])
+                pos_top, pos_left = pos_top + dTop, pos_left + dLeft
+            yield ''.join(chars), (top, left), direction
+
+class WordSearch(object):
+    """Searches a grid for any number of words in all eight directions. The
+    automaton is built once, and each line of the grid is streamed through it
+    once regardless of how many words there are.
+
+    Every run of cells that spells a word counts once. A word that is not a
+    palindrome can only be read one way along a run, so for those this is the
+    same as counting each direction. A palindrome is counted once per run
+    rather than once each way, and a single letter once per cell rather than
+    once per direction."""
+
+    def __init__(self, words: list[str]):
+        self.words = list(dict.fromkeys(words))
+        # Each pattern is a word, or a word reversed to find it read backwards.
+        # Palindromes read the same both ways, so are only searched for once.
+        patterns, self.pattern_words = [], []
+        for word in self.words:
+            for pattern, reversed_ in [(word, False), (word[::-1], True)]:
+                if reversed_ and pattern == word:
+                    continue
+                patterns.append(pattern)
+                self.pattern_words.append((word, reversed_))
+        self.automaton = Automaton(patterns)
+        # Every line through a cell reads a single letter, so those are only
+        # taken from the rows.
+        self.single_letters = {idx for idx, pattern in enumerate(patterns) if len(pattern) == 1}
+
+    def matches(self, lines: list[str]) -> Generator[Match, None, None]:
+        """Yields each match as the word, the position of its first letter,
+        and the direction it reads in."""
+        for text, (top, left), direction in grid_lines(lines):
+            dTop, dLeft = DIRECTIONS[direction]
+            for end, pattern_idx in self.automaton.search(text):
+                if direction != 'E' and pattern_idx in self.single_letters:
+                    continue
+                word, reversed_ = self.pattern_words[pattern_idx]
+                start = end - len(word) + 1
+                if reversed_:
+                    yield word, (top + dTop * end, left + dLeft * end), OPPOSITES[direction]
+                else:
+                    yield word, (top + dTop * start, left + dLeft * start), direction
+
+    def counts(self, lines: list[str]) -> dict[str, int]:
+        counts = {word: 0 for word in self.words}
+        pattern_words = [word for word, _ in self.pattern_words]
+        for text, _, direction in grid_lines(lines):
+            for _, pattern_idx in self.automaton.search(text):
+                if direction != 'E' and pattern_idx in self.single_letters:
+                    continue
+                counts[pattern_words[pattern_idx]] += 1
+        return counts
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from day4 import load_lines
+    import instrument
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d04')
+    parser.add_argument('filename')
+    parser.add_argument('words', help="file with one word per line")
+    parser.add_argument('--positions', '-p', action="store_true")
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
+    args = parser.parse_args()
+
+    instrument.enable(profile=args.profile is not None)
+
+    with instrument.timer('load'):
+        lines = load_lines(args.filename)
+        words = [word for word in load_lines(args.words) if len(word) > 0]
+    with instrument.timer('automaton'):
+        search = WordSearch(words)
+    instrument.count('automaton states', len(search.automaton.goto))
+
+    with instrument.timer('search'):
+        if args.positions:
+            for word, (top, left), direction in search.matches(lines):
+                print(f"{word} {top},{left} {direction}")
+        else:
+            for word, count in search.counts(lines).items():
+                print(f"{word}: {count}")
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
@@ -0,0 +1,52 @@
+import os
+import random
+import unittest
+from word_search import WordSearch
+
+STEPS = {'E':(0, 1), 'W':(0, -1), 'S':(1, 0), 'N':(-1, 0),
+         'SE':(1, 1), 'NW':(-1, -1), 'NE':(-1, 1), 'SW':(1, -1)}
+
+def cells(word: str, start: tuple[int, int], direction: str) -> frozenset:
+    (top, left), (dTop, dLeft) = start, STEPS[direction]
+    return frozenset((top + dTop * i, left + dLeft * i) for i in range(len(word)))
+
+def brute_force(lines: list[str], word: str) -> set[frozenset]:
+    # Every run of cells that spells the word, read from any cell in any of
+    # the eight directions.
+    height, width = len(lines), len(lines[0])
+    placements = set()
+    for top in range(height):
+        for left in range(width):
+            for dTop, dLeft in STEPS.values():
+                path = [(top + dTop * i, left + dLeft * i) for i in range(len(word))]
+                if all(0 <= t < height and 0 <= l < width and lines[t][l] == char
+                       for (t, l), char in zip(path, word)):
+                    placements.add(frozenset(path))
+    return placements
+
+class WordSearchTests(unittest.TestCase):
+    words = ['A', 'AB', 'ABC', 'CBA', 'BC', 'ABA', 'AA', 'BCB', 'CAB']
+
+    def check(self, lines: list[str]):
+        search = WordSearch(self.words)
+        expected = {word: brute_force(lines, word) for word in self.words}
+        self.assertEqual(search.counts(lines), {word: len(found) for word, found in expected.items()})
+        matches = [(word, cells(word, start, direction)) for word, start, direction in search.matches(lines)]
+        self.assertEqual(len(matches), len(set(matches)))
+        for word in self.words:
+            self.assertEqual({found for match_word, found in matches if match_word == word}, expected[word], word)
+
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.txt')) as file:
+            lines = [line.strip() for line in file if line.strip()]
+        self.assertEqual(WordSearch(['XMAS']).counts(lines), {'XMAS': 18})
+        self.assertEqual(WordSearch(['X']).counts(lines), {'X': sum(line.count('X') for line in lines)})
+
+    def test_agrees_with_brute_force(self):
+        rng = random.Random(17)
+        for _ in range(100):
+            height, width = rng.randint(1, 7), rng.randint(1, 7)
+            self.check([''.join(rng.choice('ABC') for _ in range(width)) for _ in range(height)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,85 +1,188 @@
-from typing import Generator, Literal, NewType, Self
+from typing import Generator, Iterable, Iterator, NewType, Self
+from collections import Counter
 from itertools import takewhile, pairwise
-from more_itertools import unique
-
-def logd(*_):
-    pass
+from more_itertools import chunked
+import os
+import sys
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
+import instrument
+from instrument import logd
+from parallel import fork_pool, bounded_imap
 
 PageNum = NewType('PageNum', int)
 
-class AdjacencyMatrix(object):
-    def __init__(self, pages: list[PageNum], rules: list[tuple[PageNum, PageNum]]):
-        self.pages = list(unique(pages))
-        self.page_idx = { page: i for i, page in enumerate(self.pages) }
-        width = len(self.pages)
-        self.matrix = [[0] * (width) for _ in range(width)]
+class RuleIndex(object):
+    # Built once from all the rules. Maps each page to the set of pages that
+    # must come after it.
+    def __init__(self, rules: list[tuple[PageNum, PageNum]]):
+        self.successors: dict[PageNum, set[PageNum]] = {}
         for page_from, page_to in rules:
-            self.set_adjacent(page_from, page_to)
-    
-    def has_page(self: Self, page: PageNum) -> bool:
-        return self.page_idx.get(page) is not None
+            self.add_rule(page_from, page_to)
+        instrument.count('rule indexes')
 
-    def set_adjacent(self: Self, page_from: PageNum, page_to: PageNum) -> None:
-        if not self.has_page(page_from) or not self.has_page(page_to):
-            return
-        idx_from, idx_to = self.page_idx[page_from], self.page_idx[page_to]
-        self.matrix[idx_from][idx_to] = 1
-        self.matrix[idx_to][idx_from] = -1
-
-    def adjacencies(self: Self, page_from: PageNum, *pages_to: list[PageNum]) -> list[Literal[-1, 0, 1]]:
-        idx_from = self.page_idx[page_from]
-        return [self.matrix[idx_from][self.page_idx[page_to]] for page_to in pages_to]
-
-    def __str__(self):
-        header = '   ' + ' '.join(f"{page:2d}" for page in self.pages)
-        rows = [f"{page:2d} " + ' '.join(f"{col:2d}" for col in row) for page, row in zip(self.pages, self.matrix)]
-        return '\n'.join([header] + rows)
-
-def valid(rules: list[tuple[PageNum, PageNum]], page_set: list[PageNum]) -> bool:
-    matrix = AdjacencyMatrix(page_set, rules)
-    adjacencies = [matrix.adjacencies(a, b)[0] for a, b in pairwise(page_set)]
-    is_valid = all(adjacency != -1 for adjacency in adjacencies)
-    return is_valid
-
-def in_order(rules: list[tuple[PageNum, PageNum]], page_set: list[PageNum]) -> Generator[PageNum, None, None]:
-    matrix = AdjacencyMatrix(page_set, rules)
-    while len(page_set) > 0:
-        other_pages = [(page_from, [page for page in page_set if page != page_from]) for page_from in page_set]
-        _, first_page = sorted((sum(matrix.adjacencies(page, *rest)), page) for page, rest in other_pages).pop()
-        yield first_page
-        page_set.remove(first_page)
+    def must_precede(self: Self, page_from: PageNum, page_to: PageNum) -> bool:
+        successors = self.successors.get(page_from)
+        return successors is not None and page_to in successors
+
+    def add_rule(self: Self, page_from: PageNum, page_to: PageNum) -> None:
+        self.successors.setdefault(page_from, set()).add(page_to)
+
+    def remove_rule(self: Self, page_from: PageNum, page_to: PageNum) -> None:
+        successors = self.successors.get(page_from)
+        if successors is not None:
+            successors.discard(page_to)
+
+    def rules_among(self: Self, pages: list[PageNum]) -> list[tuple[PageNum, PageNum]]:
+        # For each page, walks whichever is smaller of the pages given and the
+        # page's successors, so the cost does not grow with the whole rule set.
+        page_set = set(pages)
+        rules = []
+        for page_from in page_set:
+            successors = self.successors.get(page_from, ())
+            if len(successors) <= len(page_set):
+                rules.extend((page_from, page_to) for page_to in successors if page_to in page_set)
+            else:
+                rules.extend((page_from, page_to) for page_to in page_set if page_to in successors)
+        return rules
+
+def valid(rules: RuleIndex, page_set: list[PageNum]) -> bool:
+    return not any(rules.must_precede(b, a) for a, b in pairwise(page_set))
+
+def reachable(edges: dict[PageNum, list[PageNum]], page: PageNum) -> set[PageNum]:
+    # Every page that can be reached from `page` by following the edges.
+    found, frontier = set(), [page]
+    while frontier:
+        for next_page in edges[frontier.pop()]:
+            if next_page not in found:
+                found.add(next_page)
+                frontier.append(next_page)
+    return found
+
+def in_order(rules: RuleIndex, page_set: list[PageNum]) -> Generator[PageNum, None, None]:
+    # Kahn's topological sort over the rules among these pages, so the cost is
+    # in the number of pages and the rules between them. Pages the rules leave
+    # unordered relative to each other may come out either way, but the middle
+    # page must be the same in every order the rules allow. Raises if the rules
+    # contain a cycle or leave the middle page undecided. The order is worked
+    # out in full before yielding, so the error is raised before any pages are
+    # given out.
+    counts = Counter(page_set)
+    successors = {page: [] for page in counts}
+    predecessors = {page: [] for page in counts}
+    predecessor_counts = {page: 0 for page in counts}
+    for page_from, page_to in rules.rules_among(page_set):
+        successors[page_from].append(page_to)
+        predecessors[page_to].append(page_from)
+        predecessor_counts[page_to] += 1
+    ready = [page for page, predecessors_left in predecessor_counts.items() if predecessors_left == 0]
+    ordered = []
+    while ready:
+        page = ready.pop()
+        ordered.extend([page] * counts[page])
+        for page_to in successors[page]:
+            predecessor_counts[page_to] -= 1
+            if predecessor_counts[page_to] == 0:
+                ready.append(page_to)
+    if len(ordered) < len(page_set):
+        cycle_pages = sorted(page for page, predecessors_left in predecessor_counts.items() if predecessors_left > 0)
+        raise ValueError(f"Rules among pages {cycle_pages} contain a cycle, so they cannot be put in order")
+
+    # A page that the rules leave unordered relative to the middle page can
+    # be moved into its place, as can be seen by putting all such pages just
+    # before the middle page in one order and just after it in another. So the
+    # middle page is only decided if it is ordered against every other page.
+    if len(ordered) > 0:
+        page = ordered[len(ordered) // 2]
+        ordered_against = {page} | reachable(predecessors, page) | reachable(successors, page)
+        if len(ordered_against) < len(counts):
+            raise ValueError(f"Rules do not decide the middle page of {page_set}")
+    yield from ordered
+
+def parse_rules(lines: Iterator[str]) -> list[tuple[PageNum, PageNum]]:
+    rule_lines = takewhile(lambda line: len(line.strip()) > 0, lines)
+    rule_strings = [tuple(line.strip().split('|')) for line in rule_lines]
+    return [(int(a), int(b)) for a, b in rule_strings]
+
+def parse_page_sets(lines: Iterator[str]) -> Generator[list[PageNum], None, None]:
+    for line in lines:
+        if len(line.strip()) > 0:
+            yield [int(page) for page in line.strip().split(',')]
 
 def load(filename: str) -> tuple[list[tuple[PageNum, PageNum]], list[list[PageNum]]]:
     with open(filename, 'r') as file:
         lines = iter(file)
-        rule_lines = list(takewhile(lambda line: len(line.strip()) > 0, lines))
-        page_lines = list(lines)
-        rule_strings = [tuple(line.strip().split('|')) for line in rule_lines]
-        rules = [(int(a), int(b)) for a, b in rule_strings]
-        page_strings = [line.strip().split(',') for line in page_lines]
-        page_sets = [[int(page) for page in line] for line in page_strings]
+        rules = parse_rules(lines)
+        page_sets = list(parse_page_sets(lines))
         return rules, page_sets
 
+def middle_page(page_set: list[PageNum]) -> PageNum:
+    return page_set[len(page_set) // 2]
+
+def sum_middle_pages(rules: RuleIndex, page_sets: Iterable[list[PageNum]]) -> tuple[int, int]:
+    # Sums the middle pages of the page sets that are valid, and separately of
+    # the page sets that are not valid once they have been put in order.
+    valid_sum, resorted_sum = 0, 0
+    for page_set in page_sets:
+        if valid(rules, page_set):
+            valid_sum += middle_page(page_set)
+        else:
+            resorted_sum += middle_page(list(in_order(rules, page_set)))
+    return valid_sum, resorted_sum
+
+# Each worker process holds the rule index, built once in the parent. With the
+# fork start method it is inherited without being pickled.
+worker_rules = None
+
+def init_worker(rules: RuleIndex):
+    global worker_rules
+    worker_rules = rules
+
+def sum_middle_pages_in_chunk(page_sets: list[list[PageNum]]) -> tuple[int, int]:
+    return sum_middle_pages(worker_rules, page_sets)
+
+def stream_middle_page_sums(filename: str, workers: int = 1, chunk_size: int = 1000) -> Generator[tuple[int, int], None, None]:
+    # Reads the rules once, then streams the page sets in chunks, yielding the
+    # running sums of valid and resorted middle pages after each chunk. With
+    # more than one worker, chunks are checked in a process pool with a bounded
+    # number in flight, so memory use does not grow with the file.
+    with open(filename, 'r') as file:
+        lines = iter(file)
+        with instrument.timer('rules'):
+            rules = RuleIndex(parse_rules(lines))
+        chunks = instrument.metered('page set chunks', chunked(parse_page_sets(lines), chunk_size))
+        valid_sum, resorted_sum = 0, 0
+        if workers <= 1:
+            for chunk in chunks:
+                with instrument.timer('check'):
+                    chunk_valid_sum, chunk_resorted_sum = sum_middle_pages(rules, chunk)
+                valid_sum, resorted_sum = valid_sum + chunk_valid_sum, resorted_sum + chunk_resorted_sum
+                yield valid_sum, resorted_sum
+            return
+
+        with fork_pool(workers, init_worker, (rules,)) as pool:
+            for chunk_valid_sum, chunk_resorted_sum in bounded_imap(pool, sum_middle_pages_in_chunk, chunks, workers * 2):
+                valid_sum, resorted_sum = valid_sum + chunk_valid_sum, resorted_sum + chunk_resorted_sum
+                yield valid_sum, resorted_sum
+
 if __name__ == '__main__':
     import argparse
-    import sys
 
     parser = argparse.ArgumentParser(prog='AOC2024-d05')
     parser.add_argument('filename')
     parser.add_argument('--debug', '-d', action="store_true")
+    parser.add_argument('--workers', '-w', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
     args = parser.parse_args()
 
-    if (args.debug):
-        def logd(*args):
-            print(*args, file=sys.stderr)
-
-    rules, page_sets = load(args.filename)
+    instrument.enable(trace=args.debug, profile=args.profile is not None)
 
-    valid_page_sets = [page_set for page_set in page_sets if valid(rules, page_set)]
-    middle_pages = [page_set[int(len(page_set)/2)] for page_set in valid_page_sets]
-    print(f"sum of middle pages: {sum(middle_pages)}")
+    valid_sum, resorted_sum = 0, 0
+    for valid_sum, resorted_sum in stream_middle_page_sums(args.filename, args.workers, args.chunk_size):
+        logd("running sums: %d %d", valid_sum, resorted_sum)
 
-    invalid_page_sets = [page_set for page_set in page_sets if not valid(rules, page_set)]
-    resorted_page_sets = [list(in_order(rules, page_set)) for page_set in invalid_page_sets]
-    resorted_middle_pages = [page_set[int(len(page_set)/2)] for page_set in resorted_page_sets]
-    print(f"sum of resorted middle pages: {sum(resorted_middle_pages)}")
+    print(f"sum of middle pages: {valid_sum}")
+    print(f"sum of resorted middle pages: {resorted_sum}")
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
@@ -0,0 +1,96 @@
+import os
+import random
+import unittest
+from functools import cmp_to_key
+from itertools import combinations, permutations
+from day5 import RuleIndex, valid, in_order, middle_page, stream_middle_page_sums
+
+def random_order(rng: random.Random, pages: int) -> tuple[list[int], list[tuple[int, int]]]:
+    # A shuffled order of pages, and a rule for every pair that it implies.
+    order = rng.sample(range(10, 100), pages)
+    rules = [(a, b) for i, a in enumerate(order) for b in order[i + 1:]]
+    rng.shuffle(rules)
+    return order, rules
+
+class InOrderTests(unittest.TestCase):
+    def test_example(self):
+        rules = RuleIndex([(97, 13), (97, 61), (97, 47), (61, 13), (47, 13), (47, 61)])
+        self.assertEqual(list(in_order(rules, [61, 13, 97, 47])), [97, 47, 61, 13])
+
+    def test_matches_sort_by_rules(self):
+        rng = random.Random(12)
+        for _ in range(200):
+            order, rule_list = random_order(rng, rng.randint(1, 15))
+            rules = RuleIndex(rule_list)
+            update = rng.sample(order, rng.randint(1, len(order)))
+            update += rng.sample(update, min(len(update), rng.randint(0, 2)))
+            compare = lambda a, b: -1 if rules.must_precede(a, b) else 1 if rules.must_precede(b, a) else 0
+            ordered = list(in_order(rules, update))
+            self.assertEqual(ordered, sorted(update, key=cmp_to_key(compare)))
+            self.assertTrue(valid(rules, ordered))
+            self.assertEqual(valid(rules, update), ordered == update)
+
+    def test_cycle(self):
+        rules = RuleIndex([(1, 2), (2, 3), (3, 1), (4, 1)])
+        with self.assertRaisesRegex(ValueError, r"\[1, 2, 3\] contain a cycle"):
+            list(in_order(rules, [4, 1, 2, 3]))
+
+    def test_partial_order(self):
+        rules = RuleIndex([(1, 3), (2, 3), (3, 4), (3, 5), (4, 5)])
+        ordered = list(in_order(rules, [1, 2, 3, 5, 4]))
+        self.assertEqual(ordered[2], 3)
+        self.assertEqual(ordered[3:], [4, 5])
+        self.assertEqual(sorted(ordered[:2]), [1, 2])
+
+    def test_middle_matches_every_allowed_order(self):
+        rng = random.Random(120)
+        for _ in range(300):
+            pages = rng.sample(range(1, 20), rng.randint(1, 6))
+            # Only rules from earlier to later pages, so there is no cycle.
+            rule_list = [(a, b) for i, a in enumerate(pages) for b in pages[i + 1:] if rng.random() < 0.5]
+            rules = RuleIndex(rule_list)
+            update = rng.sample(pages, len(pages)) + rng.sample(pages, rng.randint(0, 1))
+            orders = {order for order in permutations(update)
+                      if not any(rules.must_precede(b, a) for a, b in combinations(order, 2))}
+            middles = {middle_page(list(order)) for order in orders}
+            if len(middles) > 1:
+                with self.assertRaisesRegex(ValueError, "do not decide the middle page"):
+                    list(in_order(rules, update))
+                continue
+            ordered = list(in_order(rules, update))
+            self.assertIn(tuple(ordered), orders, (rule_list, update))
+            self.assertEqual({middle_page(ordered)}, middles, (rule_list, update))
+
+    def test_ambiguous(self):
+        rules = RuleIndex([(1, 2), (1, 3)])
+        with self.assertRaisesRegex(ValueError, r"do not decide the middle page of \[3, 2, 1\]"):
+            list(in_order(rules, [3, 2, 1]))
+
+    def test_does_not_mutate(self):
+        rules = RuleIndex([(1, 2)])
+        update = [2, 1]
+        self.assertEqual(list(in_order(rules, update)), [1, 2])
+        self.assertEqual(update, [2, 1])
+        self.assertEqual(rules.successors, {1: {2}})
+
+class RuleIndexTests(unittest.TestCase):
+    def test_rules_among(self):
+        rng = random.Random(11)
+        rule_list = list({(rng.randint(1, 30), rng.randint(1, 30)) for _ in range(300)})
+        rules = RuleIndex(rule_list + [(1, page) for page in range(100, 10000)])
+        for _ in range(100):
+            pages = rng.sample(range(1, 30), rng.randint(0, 10)) + [100, 200]
+            expected = {(a, b) for a, b in rule_list + [(1, 100), (1, 200)] if a in pages and b in pages}
+            self.assertEqual(sorted(rules.rules_among(pages)), sorted(expected))
+
+class StreamTests(unittest.TestCase):
+    def test_workers_agree(self):
+        filename = os.path.join(os.path.dirname(__file__), 'example.txt')
+        for chunk_size in [1, 2, 4, 100]:
+            for workers in [1, 2]:
+                sums = list(stream_middle_page_sums(filename, workers, chunk_size))
+                self.assertEqual(sums[-1], (143, 123), (chunk_size, workers))
+                self.assertEqual(len(sums), -(-6 // chunk_size))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import numpy as np
+import sys
+from day5 import PageNum
+import instrument
+
+def dense_indices(rules: list[tuple[PageNum, PageNum]], page_sets: list[list[PageNum]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Page numbers can be arbitrarily large, so each distinct page is given a
+    # dense index instead. Returns the distinct pages in order, the rules as
+    # pairs of indices, and the pages of every page set, end to end, as indices.
+    rule_pages = np.array(rules, dtype=np.int64).reshape(-1, 2)
+    set_pages = np.fromiter((page for page_set in page_sets for page in page_set), dtype=np.int64)
+    pages, inverse = np.unique(np.concatenate([rule_pages.ravel(), set_pages]), return_inverse=True)
+    return pages, inverse[:rule_pages.size].reshape(-1, 2), inverse[rule_pages.size:]
+
+def precedence_matrix(rules: np.ndarray, size: int) -> np.ndarray:
+    # matrix[a, b] is True when the page with index a must come before the page
+    # with index b. The extra last row and column are for padding.
+    matrix = np.zeros((size + 1, size + 1), dtype=bool)
+    matrix[rules[:, 0], rules[:, 1]] = True
+    instrument.count('matrices')
+    return matrix
+
+def pack_page_sets(set_pages: np.ndarray, lengths: np.ndarray, pad: int) -> np.ndarray:
+    # One row per page set, padded out to the longest with the `pad` index.
+    pages = np.full((len(lengths), max(lengths, default=0)), pad, dtype=np.int64)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    columns = np.arange(len(set_pages)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    pages[rows, columns] = set_pages
+    return pages
+
+def valid_mask(matrix: np.ndarray, pages: np.ndarray) -> np.ndarray:
+    # A page set is invalid if any page must come before the one preceding it.
+    # Pairs involving padding never match a rule.
+    violations = matrix[pages[:, 1:], pages[:, :-1]]
+    return ~violations.any(axis=1)
+
+def middle_pages(pages: np.ndarray, lengths: np.ndarray, page_numbers: np.ndarray) -> np.ndarray:
+    # The middle page number of each page set. An empty page set has no middle
+    # page, so it is given 0, which adds nothing to a sum.
+    if pages.shape[1] == 0:
+        return np.zeros(len(pages), dtype=np.int64)
+    middles = pages[np.arange(len(pages)), lengths // 2]
+    return np.append(page_numbers, 0)[middles]
+
+def validate_all(rules: list[tuple[PageNum, PageNum]], page_sets: list[list[PageNum]]) -> tuple[np.ndarray, np.ndarray]:
+    # Returns a mask of which page sets are valid, and the middle page of each.
+    page_numbers, rule_indices, set_pages = dense_indices(rules, page_sets)
+    size = len(page_numbers)
+    matrix = precedence_matrix(rule_indices, size)
+    lengths = np.array([len(page_set) for page_set in page_sets], dtype=np.int64)
+    pages = pack_page_sets(set_pages, lengths, size)
+    return valid_mask(matrix, pages), middle_pages(pages, lengths, page_numbers)
+
+if __name__ == '__main__':
+    import argparse
+    from day5 import load, RuleIndex, in_order, middle_page
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d05')
+    parser.add_argument('filename')
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
+    args = parser.parse_args()
+
+    instrument.enable(profile=args.profile is not None)
+
+    with instrument.timer('load'):
+        rules, page_sets = load(args.filename)
+    with instrument.timer('validate'):
+        mask, middles = validate_all(rules, page_sets)
+    print(f"sum of middle pages: {middles[mask].sum()}")
+
+    with instrument.timer('resort'):
+        rule_index = RuleIndex(rules)
+        invalid_page_sets = [page_set for page_set, is_valid in zip(page_sets, mask) if not is_valid]
+        resorted_middle_pages = [middle_page(list(in_order(rule_index, page_set))) for page_set in invalid_page_sets]
+    print(f"sum of resorted middle pages: {sum(resorted_middle_pages)}")
+    if args.profile:
+        instrument.report(sys.stderr, args.profile)
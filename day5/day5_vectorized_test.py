@@ -0,0 +1,34 @@
+import random
+import unittest
+from day5 import RuleIndex, valid, middle_page
+from day5_vectorized import validate_all
+
+class ValidateAllTests(unittest.TestCase):
+    def test_agrees_with_valid(self):
+        rng = random.Random(14)
+        for _ in range(100):
+            pages = rng.sample(range(1, 10 ** 9), rng.randint(1, 20))
+            rules = [tuple(rng.sample(pages, 2)) for _ in range(rng.randint(0, 60))] if len(pages) > 1 else []
+            page_sets = [rng.sample(pages, rng.randint(0, len(pages))) for _ in range(rng.randint(0, 20))]
+            mask, middles = validate_all(rules, page_sets)
+            rule_index = RuleIndex(rules)
+            self.assertEqual(mask.tolist(), [valid(rule_index, page_set) for page_set in page_sets])
+            self.assertEqual(middles.tolist(), [middle_page(page_set) if page_set else 0 for page_set in page_sets])
+
+    def test_large_page_numbers(self):
+        mask, middles = validate_all([(1_000_000, 3)], [[3, 1_000_000], [1_000_000, 3, 7]])
+        self.assertEqual(mask.tolist(), [False, True])
+        self.assertEqual(middles.tolist(), [1_000_000, 3])
+
+    def test_empty_page_sets(self):
+        mask, middles = validate_all([(1, 2)], [[]])
+        self.assertEqual(mask.tolist(), [True])
+        self.assertEqual(middles.tolist(), [0])
+        mask, middles = validate_all([(1, 2)], [[], [2, 1]])
+        self.assertEqual(mask.tolist(), [True, False])
+        self.assertEqual(middles.tolist(), [0, 1])
+        mask, middles = validate_all([], [])
+        self.assertEqual((mask.tolist(), middles.tolist()), ([], []))
+
+if __name__ == '__main__':
+    unittest.main()
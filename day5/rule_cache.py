@@ -0,0 +1,92 @@
+from typing import Self
+from collections import OrderedDict
+from day5 import PageNum, RuleIndex, valid, in_order
+
+type Update = tuple[PageNum, ...]
+
+class RuleCache(object):
+    # A set of rules that can change over time, with the verdicts and corrected
+    # orderings of recently checked updates kept in a least-recently-used
+    # cache. A rule between two pages can only change the result for updates
+    # that contain both, so only those entries are dropped when it changes.
+    def __init__(self, rules: list[tuple[PageNum, PageNum]], max_size: int = 10000):
+        self.rules = RuleIndex(rules)
+        self.max_size = max_size
+        # Each entry is [is valid, ordering or None if not worked out yet].
+        self.entries: OrderedDict[Update, list] = OrderedDict()
+        self.updates_by_page: dict[PageNum, set[Update]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def add_rule(self: Self, page_from: PageNum, page_to: PageNum) -> None:
+        if self.rules.must_precede(page_from, page_to):
+            return
+        self.rules.add_rule(page_from, page_to)
+        self.invalidate(page_from, page_to)
+
+    def remove_rule(self: Self, page_from: PageNum, page_to: PageNum) -> None:
+        if not self.rules.must_precede(page_from, page_to):
+            return
+        self.rules.remove_rule(page_from, page_to)
+        self.invalidate(page_from, page_to)
+
+    def invalidate(self: Self, page_a: PageNum, page_b: PageNum) -> None:
+        affected = self.updates_by_page.get(page_a, set()) & self.updates_by_page.get(page_b, set())
+        for update in affected:
+            self.__drop__(update)
+        self.invalidations += len(affected)
+
+    # Each lookup counts as one hit or one miss. For an ordering, a miss is
+    # any lookup that has to work the ordering out, even if the verdict for
+    # the update was already cached.
+    def valid(self: Self, update: list[PageNum]) -> bool:
+        entry, cached = self.__entry__(tuple(update))
+        self.__count__(cached)
+        return entry[0]
+
+    def in_order(self: Self, update: list[PageNum]) -> list[PageNum]:
+        entry, cached = self.__entry__(tuple(update))
+        self.__count__(cached and entry[1] is not None)
+        if entry[1] is None:
+            entry[1] = list(in_order(self.rules, update))
+        return list(entry[1])
+
+    def stats(self: Self) -> dict[str, int]:
+        return {'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations}
+
+    def __count__(self: Self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def __entry__(self: Self, update: Update) -> tuple[list, bool]:
+        # The entry for the update, and whether it was already cached.
+        entry = self.entries.get(update)
+        if entry is not None:
+            self.entries.move_to_end(update)
+            return entry, True
+        entry = [valid(self.rules, list(update)), None]
+        self.entries[update] = entry
+        for page in update:
+            self.updates_by_page.setdefault(page, set()).add(update)
+        if len(self.entries) > self.max_size:
+            oldest = next(iter(self.entries))
+            self.__drop__(oldest)
+            self.evictions += 1
+        return entry, False
+
+    def __drop__(self: Self, update: Update) -> None:
+        del self.entries[update]
+        for page in update:
+            updates = self.updates_by_page.get(page)
+            if updates is not None:
+                updates.discard(update)
+                if not updates:
+                    del self.updates_by_page[page]
@@ -0,0 +1,50 @@
+import unittest
+from rule_cache import RuleCache
+
+class RuleCacheTests(unittest.TestCase):
+    def test_stats(self):
+        cache = RuleCache([(1, 2), (2, 3)])
+        self.assertFalse(cache.valid([3, 2, 1]))
+        self.assertEqual(cache.in_order([3, 2, 1]), [1, 2, 3])
+        self.assertEqual(cache.in_order([3, 2, 1]), [1, 2, 3])
+        self.assertFalse(cache.valid([3, 2, 1]))
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 2, 'misses': 2, 'evictions': 0, 'invalidations': 0})
+
+    def test_invalidate_only_updates_with_both_pages(self):
+        cache = RuleCache([(1, 2)])
+        for update in [[1, 2], [2, 3], [1, 3], [3, 1, 4], [4, 2, 3]]:
+            cache.valid(update)
+        cache.add_rule(3, 1)
+        self.assertEqual(set(cache.entries), {(1, 2), (2, 3), (4, 2, 3)})
+        self.assertEqual(cache.stats()['invalidations'], 2)
+        self.assertNotIn((1, 3), cache.updates_by_page.get(1, set()))
+        self.assertNotIn((3, 1, 4), cache.updates_by_page.get(4, set()))
+        self.assertFalse(cache.valid([1, 3]))
+
+        cache.remove_rule(1, 2)
+        self.assertEqual(set(cache.entries), {(2, 3), (4, 2, 3), (1, 3)})
+        self.assertTrue(cache.valid([2, 1]))
+        # Adding a rule that already holds changes nothing.
+        cache.add_rule(3, 1)
+        self.assertEqual(cache.stats()['invalidations'], 3)
+
+    def test_drops_page_index_when_empty(self):
+        cache = RuleCache([])
+        cache.valid([5, 6])
+        cache.add_rule(5, 6)
+        self.assertEqual(cache.updates_by_page, {})
+
+    def test_eviction(self):
+        cache = RuleCache([(1, 2)], max_size=2)
+        cache.valid([1, 2])
+        cache.valid([2, 3])
+        cache.valid([1, 2])
+        cache.valid([3, 4])
+        self.assertEqual(list(cache.entries), [(1, 2), (3, 4)])
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(set(cache.updates_by_page), {1, 2, 3, 4})
+        self.assertEqual(cache.updates_by_page[2], {(1, 2)})
+        self.assertEqual(cache.updates_by_page[3], {(3, 4)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+from typing import Literal
+import numpy as np
+from map import Map, Point
+import instrument
+
+# Facings as indexes into these arrays, in turn_right order.
+FACINGS = 'NESW'
+FACING_DELTAS = np.array([(-1, 0), (0, 1), (1, 0), (0, -1)])
+
+# Bytes of visited state allowed per batch, at one byte per cell per world.
+MEMORY_BUDGET = 1 << 26
+
+def batch_size_for(height: int, width: int, memory_budget: int = MEMORY_BUDGET) -> int:
+    """The number of worlds whose visited state fits in the budget, and at
+    least one."""
+    return max(1, memory_budget // max(1, height * width))
+
+def simulate_batch(initial_map: Map,
+                   candidates: list[Point],
+                   batch_size: int | None = None,
+                   memory_budget: int = MEMORY_BUDGET) -> list[Literal['exit', 'loop']]:
+    """Runs the guard to the end on one copy of the map per candidate, with an
+    extra obstacle placed at that candidate, and returns whether each run
+    exits or loops. All copies advance together one step at a time as arrays,
+    in batches whose visited state fits in `memory_budget` bytes unless a
+    `batch_size` is given."""
+    batch_size = batch_size or batch_size_for(initial_map.height, initial_map.width, memory_budget)
+    obstacles = np.zeros((initial_map.height, initial_map.width), dtype=bool)
+    for top, left in initial_map.obstacles + initial_map.added_obstacles:
+        if initial_map.in_bounds((top, left)):
+            obstacles[top, left] = True
+    verdicts = []
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        looped = simulate_lockstep(obstacles, initial_map.guard_state, np.array(batch, dtype=np.int64).reshape(-1, 2))
+        verdicts.extend('loop' if loop else 'exit' for loop in looped)
+    return verdicts
+
+def simulate_lockstep(obstacles: np.ndarray, guard_state, extras: np.ndarray) -> np.ndarray:
+    """Advances one world per row of `extras`, each with that extra obstacle
+    added to the shared `obstacles` grid, until every world has exited or
+    looped. Returns a boolean array that is True for the worlds that looped."""
+    height, width = obstacles.shape
+    (guard_top, guard_left), guard_facing = guard_state
+    count = len(extras)
+
+    tops = np.full(count, guard_top, dtype=np.int64)
+    lefts = np.full(count, guard_left, dtype=np.int64)
+    facings = np.full(count, FACINGS.index(guard_facing), dtype=np.int64)
+    extra_cells = extras[:, 0] * width + extras[:, 1]
+    # One byte per cell per world, with a bit set for each facing visited.
+    visited = np.zeros((count, height * width), dtype=np.uint8)
+    looped = np.zeros(count, dtype=bool)
+
+    # Indexes of the worlds still running; finished ones drop out.
+    active = np.arange(count)
+    visited[active, tops * width + lefts] |= np.left_shift(1, facings).astype(np.uint8)
+    while len(active) > 0:
+        # One step for each world still running.
+        instrument.count('steps', len(active))
+        deltas = FACING_DELTAS[facings]
+        ahead_tops, ahead_lefts = tops + deltas[:, 0], lefts + deltas[:, 1]
+
+        in_bounds = (ahead_tops >= 0) & (ahead_tops < height) & (ahead_lefts >= 0) & (ahead_lefts < width)
+        active, tops, lefts, facings = active[in_bounds], tops[in_bounds], lefts[in_bounds], facings[in_bounds]
+        ahead_tops, ahead_lefts = ahead_tops[in_bounds], ahead_lefts[in_bounds]
+
+        ahead_cells = ahead_tops * width + ahead_lefts
+        blocked = obstacles[ahead_tops, ahead_lefts] | (ahead_cells == extra_cells[active])
+        facings = np.where(blocked, (facings + 1) % 4, facings)
+        tops = np.where(blocked, tops, ahead_tops)
+        lefts = np.where(blocked, lefts, ahead_lefts)
+
+        cells = tops * width + lefts
+        flags = np.left_shift(1, facings).astype(np.uint8)
+        seen = (visited[active, cells] & flags) != 0
+        looped[active[seen]] = True
+        running = ~seen
+        active, tops, lefts, facings = active[running], tops[running], lefts[running], facings[running]
+        visited[active, cells[running]] |= flags[running]
+    return looped
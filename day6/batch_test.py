@@ -0,0 +1,42 @@
+import unittest
+from map import Map
+from batch import batch_size_for, simulate_batch
+
+class BatchTests(unittest.TestCase):
+    def test_simulate_batch(self):
+        rows = ['....#.....',
+                '.........#',
+                '..........',
+                '..#.......',
+                '.......#..',
+                '..........',
+                '.#..^.....',
+                '........#.',
+                '#.........',
+                '......#...']
+        map = Map.parse(rows)
+        candidates = [(top, left) for top in range(10) for left in range(10) if not map.is_obstacle((top, left))]
+        candidates.remove((6, 4))
+        expected = []
+        for candidate in candidates:
+            test_map = map.clone()
+            test_map.set_obstacle(candidate)
+            expected.append(test_map.run_to_end())
+        self.assertEqual(simulate_batch(map, candidates, batch_size=7), expected)
+        self.assertEqual(simulate_batch(map, candidates).count('loop'), 6)
+        # 100 cells per world, so a budget of 700 bytes runs 7 worlds at a time.
+        self.assertEqual(batch_size_for(10, 10, 700), 7)
+        self.assertEqual(simulate_batch(map, candidates, memory_budget=700), expected)
+
+    def test_batch_size_for(self):
+        self.assertEqual(batch_size_for(1000, 1000, 1 << 26), 67)
+        self.assertEqual(batch_size_for(5000, 5000, 1 << 26), 2)
+        self.assertEqual(batch_size_for(10000, 10000, 1 << 26), 1)
+
+    def test_simulate_batch_empty(self):
+        map = Map.parse(['.^.'])
+        self.assertEqual(simulate_batch(map, []), [])
+        self.assertEqual(simulate_batch(map, [(0, 0)]), ['exit'])
+
+if __name__ == '__main__':
+    unittest.main()
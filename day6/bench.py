@@ -0,0 +1,126 @@
+from typing import Callable, Literal
+import random
+import time
+from map import Map, JumpTable
+from day6 import find_loop_traps
+
+type MapKind = Literal['random', 'loop', 'exit']
+
+def generate_map(size: int, density: float, seed: int, kind: MapKind = 'random') -> list[str]:
+    """Generates a square map with obstacles scattered at the given density
+    and the guard facing north in the lower half. For the 'loop' and 'exit'
+    kinds, a rectangular path through most of the map is cleared and walled
+    so that the guard is guaranteed to walk around it forever, or to walk
+    three sides of it and then out of the west edge."""
+    rng = random.Random(seed)
+    grid = [['#' if rng.random() < density else '.' for _ in range(size)] for _ in range(size)]
+    guard_top, guard_left = size * 3 // 4, size // 4
+    if kind != 'random':
+        # The guard heads north to first_top, east to last_left, south to
+        # last_top and west back past its starting column.
+        first_top, last_top = max(1, size // 8), min(size - 2, size * 7 // 8)
+        last_left = min(size - 2, size * 7 // 8)
+        path = ([(top, guard_left) for top in range(first_top, last_top + 1)] +
+                [(first_top, left) for left in range(guard_left, last_left + 1)] +
+                [(top, last_left) for top in range(first_top, last_top + 1)] +
+                [(last_top, left) for left in range(guard_left, last_left + 1)])
+        for top, left in path:
+            grid[top][left] = '.'
+        for top, left in [(first_top - 1, guard_left), (first_top, last_left + 1), (last_top + 1, last_left)]:
+            grid[top][left] = '#'
+        if kind == 'loop':
+            grid[last_top][guard_left - 1] = '#'
+        else:
+            for left in range(guard_left):
+                grid[last_top][left] = '.'
+    grid[guard_top][guard_left] = '^'
+    return [''.join(row) for row in grid]
+
+def best_time(action: Callable[[], object], repeat: int) -> float:
+    """Runs the action `repeat` times and returns the fastest, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def run_to_end_with(map: Map, engine: str) -> Literal['exit', 'loop']:
+    test_map = map.clone()
+    if engine == 'turns':
+        return test_map.run_to_end('step', loop_detection='turns')
+    return test_map.run_to_end(engine)
+
+def advance_throughput(map: Map, steps: int) -> float:
+    """Advances a clone of the map up to `steps` times and returns the number
+    of steps per second."""
+    test_map = map.clone()
+    taken = 0
+    start = time.perf_counter()
+    while taken < steps and test_map.guard_in_bounds():
+        test_map.advance()
+        taken += 1
+    return taken / max(time.perf_counter() - start, 1e-9)
+
+def bench_map(rows: list[str], engines: list[str], sweep_engines: list[str], sweep_limit: int, repeat: int) -> dict:
+    """Times each stage on one map, returning the results as a dict."""
+    results = {}
+    results['parse'] = best_time(lambda: Map.parse(rows), repeat)
+    map = Map.parse(rows)
+    results['clone'] = best_time(lambda: map.clone(), repeat)
+    results['advance_per_second'] = advance_throughput(map, 100_000)
+    # The jump table is shared by every clone and built on first use. Time it
+    # on its own and build it up front, so the jump engine is timed without it.
+    results['jump_table'] = best_time(lambda: JumpTable(map.height, map.width, map.obstacles), repeat)
+    map.jump_table()
+    for engine in engines:
+        results[f"run_to_end_{engine}"] = best_time(lambda: run_to_end_with(map, engine), repeat)
+    first_run_map = map.clone()
+    results['outcome'] = first_run_map.run_to_end('jump')
+    results['path_size'] = first_run_map.visited_space_count()
+    results['visited_spaces'] = best_time(lambda: first_run_map.visited_spaces(), repeat)
+
+    guard_pos, _ = map.guard_state
+    candidates = [pos for pos in first_run_map.visited_spaces() if pos != guard_pos][:sweep_limit]
+    results['sweep_candidates'] = len(candidates)
+    for engine in sweep_engines:
+        results[f"sweep_{engine}"] = best_time(lambda: find_loop_traps(map, candidates, engine), 1)
+    return results
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import platform
+    import subprocess
+    import sys
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d06-bench')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.01, 0.05])
+    parser.add_argument('--kinds', nargs='+', choices=['random', 'loop', 'exit'], default=['random', 'loop', 'exit'])
+    parser.add_argument('--engines', nargs='+', choices=['step', 'turns', 'jump'], default=['step', 'turns', 'jump'])
+    parser.add_argument('--sweep-engines', nargs='+',
+                        choices=['step', 'turns', 'jump', 'incremental', 'batch'], default=['jump', 'incremental'])
+    parser.add_argument('--sweep-limit', type=int, default=1000, help="maximum loop trap candidates to sweep")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--output', '-o', help="append JSON lines results to this file")
+    args = parser.parse_args()
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+
+    output = open(args.output, 'a') if args.output else None
+    for size in args.sizes:
+        for density in args.densities:
+            for kind in args.kinds:
+                rows = generate_map(size, density, args.seed, kind)
+                results = bench_map(rows, args.engines, args.sweep_engines, args.sweep_limit, args.repeat)
+                record = {'commit': commit, 'python': platform.python_version(), 'time': time.time(),
+                          'size': size, 'density': density, 'kind': kind, 'seed': args.seed, **results}
+                print(json.dumps(record), file=output or sys.stdout, flush=True)
+                print(f"{size}x{size} {density} {kind}: {results['outcome']}, path {results['path_size']}", file=sys.stderr)
+    if output:
+        output.close()
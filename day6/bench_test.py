@@ -0,0 +1,26 @@
+import unittest
+from map import Map
+from bench import bench_map, generate_map
+
+class BenchTests(unittest.TestCase):
+    def test_generate_map(self):
+        rows = generate_map(20, 0.1, 1)
+        self.assertEqual(len(rows), 20)
+        self.assertTrue(all(len(row) == 20 for row in rows))
+        self.assertEqual(rows, generate_map(20, 0.1, 1))
+        self.assertEqual(Map.parse(rows).guard_state, ((15, 5), 'N'))
+
+    def test_generate_map_kinds(self):
+        for seed in range(10):
+            for size in [8, 50]:
+                self.assertEqual(Map.parse(generate_map(size, 0.2, seed, 'loop')).run_to_end(), 'loop')
+                self.assertEqual(Map.parse(generate_map(size, 0.2, seed, 'exit')).run_to_end(), 'exit')
+
+    def test_bench_map(self):
+        results = bench_map(generate_map(30, 0.1, 2), ['step', 'jump'], ['jump'], 10, 1)
+        self.assertIn('jump_table', results)
+        self.assertIn('run_to_end_jump', results)
+        self.assertEqual(results['sweep_candidates'], min(10, results['path_size'] - 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,47 +1,166 @@
+from typing import Callable, Literal
+from collections import Counter
 from map import Map, Point
-
-def logd(*_):
-    pass
+from trajectory import Trajectory
+import sys
+import instrument
+from instrument import logd
+from parallel import fork_pool
 
 def load(filename: str) -> Map:
     with open(filename, 'r') as file:
         rows = list(file)
         return Map.parse(rows)
 
+# 'turns' is the step engine detecting loops only at turns.
+type Engine = Literal['step', 'turns', 'jump', 'incremental', 'batch']
+
+def is_loop_trap(initial_map: Map, candidate: Point, engine: Literal['step', 'turns', 'jump']) -> bool:
+    test_map = initial_map.clone()
+    test_map.set_obstacle(candidate)
+    if engine == 'turns':
+        return test_map.run_to_end('step', loop_detection='turns') == 'loop'
+    return test_map.run_to_end(engine) == 'loop'
+
+def loop_trap_test(initial_map: Map, engine: Engine, trajectory: Trajectory | None = None) -> Callable[[Point], bool]:
+    if engine == 'incremental':
+        return (trajectory or Trajectory(initial_map)).is_loop_trap
+    if engine == 'jump':
+        # Build the shared jump table up front so every clone reuses it.
+        initial_map.jump_table()
+    return lambda candidate: is_loop_trap(initial_map, candidate, engine)
+
+def loop_trap_finder(initial_map: Map, engine: Engine, trajectory: Trajectory | None = None) -> Callable[[list[Point]], list[Point]]:
+    if engine == 'batch':
+        from batch import simulate_batch
+        return lambda candidates: [candidate
+                                   for candidate, verdict in zip(candidates, simulate_batch(initial_map, candidates))
+                                   if verdict == 'loop']
+    test = loop_trap_test(initial_map, engine, trajectory)
+    return lambda candidates: [candidate for candidate in candidates if test(candidate)]
+
+def count_work(map_type: type[Map], engine: Engine) -> str:
+    # Counts the unit of work the engine does when profiling, and returns its
+    # name. Every engine but jump moves the guard a single step at a time;
+    # batch counts its own steps, one per world still running.
+    match engine:
+        case 'step' | 'incremental':
+            instrument.count_calls(map_type, 'advance', 'steps')
+        case 'turns':
+            instrument.count_calls(map_type, '__move__', 'steps')
+        case 'jump':
+            instrument.count_calls(map_type, 'teleport', 'jumps')
+            return 'jumps'
+    return 'steps'
+
+# Each worker process holds its own snapshot of the initial map. With the fork
+# start method it is inherited from the parent without being pickled at all.
+worker_finder = None
+
+def init_worker(initial_map: Map, engine: Engine, trajectory: Trajectory | None):
+    global worker_finder
+    worker_finder = loop_trap_finder(initial_map, engine, trajectory)
+    # Drop the counts inherited from the parent, so only this worker's own
+    # work is sent back.
+    instrument.take_counters()
+
+def find_loop_traps_in_chunk(indexed_chunk: tuple[int, list[Point]]) -> tuple[int, list[Point], Counter[str]]:
+    chunk_idx, candidates = indexed_chunk
+    loop_traps = worker_finder(candidates)
+    return chunk_idx, loop_traps, instrument.take_counters()
+
+def find_loop_traps(initial_map: Map,
+                    candidates: list[Point],
+                    engine: Engine = 'step',
+                    workers: int = 1,
+                    progress: Callable[[int, int], None] = lambda done, total: None) -> list[Point]:
+    chunk_size = max(1, len(candidates) // (max(workers, 1) * 16))
+    chunks = [candidates[i:i + chunk_size] for i in range(0, len(candidates), chunk_size)]
+    # The incremental engine's first run is recorded once, here, rather than
+    # again in every worker.
+    trajectory = Trajectory(initial_map) if engine == 'incremental' else None
+    if workers <= 1:
+        finder = loop_trap_finder(initial_map, engine, trajectory)
+        loop_traps, done = [], 0
+        for chunk in chunks:
+            progress(done, len(candidates))
+            loop_traps.extend(finder(chunk))
+            instrument.count('candidates', len(chunk))
+            done += len(chunk)
+        return loop_traps
+
+    if engine == 'jump':
+        # Build the jump table before forking so workers inherit it.
+        initial_map.jump_table()
+    chunk_results = [[] for _ in chunks]
+    done = 0
+    # Workers only send back their results; progress is reported from here.
+    with fork_pool(workers, init_worker, (initial_map, engine, trajectory)) as pool:
+        results = pool.imap_unordered(find_loop_traps_in_chunk, enumerate(chunks))
+        for chunk_idx, loop_traps, counts in results:
+            chunk_results[chunk_idx] = loop_traps
+            instrument.counters.update(counts)
+            instrument.count('candidates', len(chunks[chunk_idx]))
+            done += len(chunks[chunk_idx])
+            progress(done, len(candidates))
+    return [candidate for loop_traps in chunk_results for candidate in loop_traps]
+
 if __name__ == '__main__':
     import argparse
-    import sys
 
     parser = argparse.ArgumentParser(prog='AOC2024-d05')
     parser.add_argument('filename')
     parser.add_argument('--debug', '-d', action="store_true")
+    parser.add_argument('--engine', choices=['step', 'turns', 'jump', 'incremental', 'batch'], default='step')
+    parser.add_argument('--workers', '-w', type=int, default=1)
+    parser.add_argument('--sparse', action="store_true")
+    parser.add_argument('--trace', help="record the guard's first run to this file")
+    parser.add_argument('--profile', nargs='?', const='text', choices=['text', 'json'])
     args = parser.parse_args()
 
-    if (args.debug):
-        def logd(*args):
-            print(*args, file=sys.stderr)
+    if args.sparse and args.engine not in ['step', 'incremental']:
+        parser.error(f"--sparse does not support the {args.engine} engine")
+
+    instrument.enable(trace=args.debug, profile=args.profile is not None)
 
-    initial_map = load(args.filename)
+    if args.sparse:
+        from sparse import load_sparse
+        initial_map = load_sparse(args.filename)
+    else:
+        initial_map = load(args.filename)
     logd(initial_map)
 
+    trace = None
+    if args.trace:
+        from guard_trace import TraceWriter
+        trace = TraceWriter(args.trace, initial_map)
+
     first_run_map = initial_map.clone()
-    while first_run_map.guard_in_bounds():
-        if args.debug:
-            input("Press Enter to continue...")
-        first_run_map.advance()
-        logd(first_run_map)
-    
+    with instrument.timer('first run'):
+        while first_run_map.guard_in_bounds():
+            if args.debug:
+                input("Press Enter to continue...")
+            first_run_map.advance()
+            if trace:
+                trace.record(first_run_map.guard_state)
+            logd(first_run_map)
+
+    if trace:
+        trace.close()
+
     print(f"Unique path size: {first_run_map.visited_space_count()}")
 
     loop_trap_candidates = first_run_map.visited_spaces()
     initial_guard_pos, _ = initial_map.guard_state
     loop_trap_candidates.remove(initial_guard_pos)
 
-    def is_loop_trap(i: int, candidate: Point) -> bool:
-        print(f"\033[0KChecking candidate {i}/{len(loop_trap_candidates)}\033[1F", file=sys.stderr)
-        test_map = initial_map.clone()
-        test_map.set_obstacle(candidate)
-        return test_map.run_to_end() == 'loop'
-    
-    loop_traps = [candidate for i, candidate in enumerate(loop_trap_candidates) if is_loop_trap(i, candidate)]
+    def report_progress(done: int, total: int):
+        print(f"\033[0KChecking candidate {done}/{total}\033[1F", file=sys.stderr)
+
+    work = count_work(type(initial_map), args.engine)
+    with instrument.timer('loop traps'):
+        loop_traps = find_loop_traps(initial_map, loop_trap_candidates, args.engine, args.workers, report_progress)
     print(f"\033[0KNumber of loop traps: {len(loop_traps)}")
+    if args.profile:
+        instrument.note(f"{work} per candidate", instrument.counters[work] / max(1, len(loop_trap_candidates)))
+        instrument.report(sys.stderr, args.profile)
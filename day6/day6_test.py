@@ -0,0 +1,47 @@
+import os
+import unittest
+from day6 import load, find_loop_traps, count_work
+from map import Map
+import instrument
+
+class FindLoopTrapsTests(unittest.TestCase):
+    def setUp(self):
+        self.initial_map = load(os.path.join(os.path.dirname(__file__), 'example.txt'))
+        first_run_map = self.initial_map.clone()
+        while first_run_map.guard_in_bounds():
+            first_run_map.advance()
+        self.candidates = first_run_map.visited_spaces()
+        initial_guard_pos, _ = self.initial_map.guard_state
+        self.candidates.remove(initial_guard_pos)
+
+    def test_workers_agree(self):
+        for engine in ['step', 'turns', 'jump', 'incremental', 'batch']:
+            serial = find_loop_traps(self.initial_map, self.candidates, engine, workers=1)
+            parallel = find_loop_traps(self.initial_map, self.candidates, engine, workers=2)
+            self.assertEqual(len(serial), 6, engine)
+            self.assertEqual(parallel, serial, engine)
+
+    def test_work_counted_for_every_engine(self):
+        methods = {name: getattr(Map, name) for name in ['advance', '__move__', 'teleport']}
+        def restore():
+            for name, method in methods.items():
+                setattr(Map, name, method)
+        instrument.enable(profile=True)
+        try:
+            for engine in ['step', 'turns', 'jump', 'incremental', 'batch']:
+                work = count_work(Map, engine)
+                counts = []
+                for workers in [1, 2]:
+                    instrument.reset()
+                    find_loop_traps(self.initial_map, self.candidates, engine, workers)
+                    counts.append(instrument.counters[work])
+                self.assertGreater(counts[0], len(self.candidates), engine)
+                self.assertEqual(counts[1], counts[0], engine)
+                restore()
+        finally:
+            instrument.enable()
+            instrument.reset()
+            restore()
+
+if __name__ == '__main__':
+    unittest.main()
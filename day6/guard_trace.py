@@ -0,0 +1,102 @@
+from typing import BinaryIO, Generator, TextIO
+import struct
+from map import Map, Point, Facing, GuardState, facing_to_guard_char
+
+# A trace is a header giving the map size and the guard's starting state,
+# followed by one fixed-size record per step: the guard's position and facing
+# after the step, and whether the step was a turn.
+TRACE_MAGIC = b'D6TR'
+TRACE_HEADER = struct.Struct('<4sIIiiB')
+TRACE_RECORD = struct.Struct('<iiBB')
+FACINGS = 'NESW'
+
+type TraceStep = tuple[Point, Facing, bool]
+
+class TraceWriter(object):
+    """Appends a binary record of each guard step to a file. Each record is a
+    single struct pack into a buffered write, so recording costs about the
+    same no matter how big the map is."""
+
+    def __init__(self, filename: str, map: Map):
+        self.file: BinaryIO = open(filename, 'wb')
+        (top, left), facing = map.guard_state
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, map.height, map.width, top, left, FACINGS.index(facing)))
+        self.facing = facing
+
+    def record(self, guard_state: GuardState):
+        (top, left), facing = guard_state
+        self.file.write(TRACE_RECORD.pack(top, left, FACINGS.index(facing), facing != self.facing))
+        self.facing = facing
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+def read_trace(filename: str) -> tuple[int, int, GuardState, Generator[TraceStep, None, None]]:
+    """Reads the header of a trace file, returning the map height and width,
+    the guard's starting state, and a generator over the recorded steps. The
+    header is read and the file closed straight away; the generator opens the
+    file again only once it is iterated, and closes it when done or when it is
+    closed itself."""
+    with open(filename, 'rb') as file:
+        header = file.read(TRACE_HEADER.size)
+    if len(header) < TRACE_HEADER.size:
+        raise ValueError(f"{filename} is too short to be a day6 trace")
+    magic, height, width, top, left, facing = TRACE_HEADER.unpack(header)
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"{filename} is not a day6 trace")
+    return height, width, ((top, left), FACINGS[facing]), trace_steps(filename)
+
+def trace_steps(filename: str) -> Generator[TraceStep, None, None]:
+    """Yields the steps recorded after the header of a trace file."""
+    with open(filename, 'rb') as file:
+        file.seek(TRACE_HEADER.size)
+        while chunk := file.read(TRACE_RECORD.size * 4096):
+            for top, left, facing, turned in TRACE_RECORD.iter_unpack(chunk):
+                yield ((top, left), FACINGS[facing], bool(turned))
+
+def render(map: Map, steps: Generator[TraceStep, None, None], out: TextIO, delay: float = 0):
+    """Draws the map once, then replays the steps by redrawing only the cells
+    that change: the cell the guard left and the cell it is now on."""
+    import time
+
+    def draw(pos: Point, char: str):
+        top, left = pos
+        if map.in_bounds(pos):
+            out.write(f"\033[{top + 1};{left + 1}H{char}")
+
+    out.write("\033[2J\033[H")
+    out.write(str(map).replace('\n', '\r\n'))
+    guard_pos, _ = map.guard_state
+    for pos, facing, _ in steps:
+        if pos != guard_pos:
+            draw(guard_pos, 'o')
+        draw(pos, facing_to_guard_char(facing))
+        guard_pos = pos
+        out.flush()
+        if delay > 0:
+            time.sleep(delay)
+    out.write(f"\033[{map.height + 1};1H")
+    out.flush()
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from day6 import load
+
+    parser = argparse.ArgumentParser(prog='AOC2024-d06-trace')
+    parser.add_argument('filename')
+    parser.add_argument('trace')
+    parser.add_argument('--delay', type=float, default=0)
+    args = parser.parse_args()
+
+    map = load(args.filename)
+    height, width, guard_state, steps = read_trace(args.trace)
+    if (height, width, guard_state) != (map.height, map.width, map.guard_state):
+        parser.error(f"{args.trace} was not recorded on {args.filename}")
+    render(map, steps, sys.stdout, args.delay)
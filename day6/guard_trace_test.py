@@ -0,0 +1,72 @@
+import gc
+import io
+import os
+import tempfile
+import unittest
+import warnings
+from map import Map
+from guard_trace import TraceWriter, read_trace, render
+
+class GuardTraceTests(unittest.TestCase):
+    rows = ['.#...',
+            '....#',
+            '#...<',
+            '.##..']
+
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_round_trip(self):
+        map = Map.parse(self.rows)
+        states = []
+        with TraceWriter(self.filename, map) as trace:
+            for _ in range(5):
+                map.advance()
+                trace.record(map.guard_state)
+                states.append(map.guard_state)
+        height, width, guard_state, steps = read_trace(self.filename)
+        self.assertEqual((height, width, guard_state), (4, 5, ((2, 4), 'W')))
+        steps = list(steps)
+        self.assertEqual([(pos, facing) for pos, facing, _ in steps], states)
+        self.assertEqual([turned for _, _, turned in steps], [False, False, False, True, False])
+
+    def test_render(self):
+        map = Map.parse(self.rows)
+        out = io.StringIO()
+        render(map, iter([((2, 3), 'W', False), ((2, 3), 'N', True)]), out)
+        self.assertIn('\033[3;5Ho\033[3;4H<\033[3;4H^', out.getvalue())
+
+    def test_not_a_trace(self):
+        with open(self.filename, 'wb') as file:
+            file.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            read_trace(self.filename)
+
+    def test_truncated_header(self):
+        with open(self.filename, 'wb') as file:
+            file.write(b'D6TR\0')
+        with self.assertRaisesRegex(ValueError, "too short"):
+            read_trace(self.filename)
+
+    def test_abandoned_steps_close_file(self):
+        map = Map.parse(self.rows)
+        with TraceWriter(self.filename, map) as trace:
+            for _ in range(5):
+                map.advance()
+                trace.record(map.guard_state)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', ResourceWarning)
+            _, _, _, steps = read_trace(self.filename)
+            next(steps)
+            del steps
+            _, _, _, steps = read_trace(self.filename)
+            del steps
+            gc.collect()
+        self.assertEqual([warning for warning in caught if issubclass(warning.category, ResourceWarning)], [])
+
+if __name__ == '__main__':
+    unittest.main()
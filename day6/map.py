@@ -1,4 +1,12 @@
-from typing import Literal, Self
+from typing import Iterable, Literal, Self
+from array import array
+import os
+import sys
+
+# Every other module of the day imports this one first, so this is where the
+# modules shared by every day, in the directory above, are made importable.
+if (repo_root := os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.append(repo_root)
 
 type Point = tuple[int, int]
 type Facing = Literal['N', 'E', 'S', 'W']
@@ -14,6 +22,16 @@ def forward(pos: Point, facing: Facing) -> Point:
     dTop, dLeft = {'N':(-1,0), 'E':(0,1), 'S':(1,0), 'W':(0,-1)}[facing]
     return (top + dTop, left + dLeft)
 
+def steps_ahead(pos: Point, target: Point, facing: Facing) -> int | None:
+    top, left = pos
+    target_top, target_left = target
+    match facing:
+        case 'N' if left == target_left and target_top < top: return top - target_top
+        case 'E' if top == target_top and target_left > left: return target_left - left
+        case 'S' if left == target_left and target_top > top: return target_top - top
+        case 'W' if top == target_top and target_left < left: return left - target_left
+    return None
+
 type GuardChar = Literal['^', '>', 'v', '<']
 type GuardState = tuple[Point, Facing]
 
@@ -26,7 +44,109 @@ def guard_char_to_facing(guard_char: GuardChar) -> Facing:
 def find_in_grid(rows: list[str], search_chars: str) -> list[Point]:
     return [(top, left) for top, row in enumerate(rows) for left, char in enumerate(row) if char in search_chars]
 
-class Map(object):
+class JumpTable(object):
+    # For every cell and facing, the flat index of the cell where a guard
+    # walking that way stops in front of an obstacle, or -1 if it walks out of
+    # bounds instead. Each facing is one array of 32-bit ints.
+    def __init__(self, height: int, width: int, obstacles: Iterable[Point]):
+        self.height = height
+        self.width = width
+        rows = [[] for _ in range(height)]
+        columns = [[] for _ in range(width)]
+        for top, left in sorted(set(obstacles)):
+            if 0 <= top < height and 0 <= left < width:
+                rows[top].append(left)
+                columns[left].append(top)
+        self.stops = {facing: array('i', [-1]) * (height * width) for facing in 'NESW'}
+        for top, lefts in enumerate(rows):
+            self.__fill_line__('W', 'E', top * width, 1, width, lefts)
+        for left, tops in enumerate(columns):
+            self.__fill_line__('N', 'S', left, width, height, tops)
+
+    def __fill_line__(self, backward: Facing, forward: Facing, start: int, stride: int, length: int, blocked: list[int]):
+        # Fills one row or column, whose cells are at start + i * stride, given
+        # the sorted positions along it that are blocked. Walking backward, a
+        # guard stops just past the nearest obstacle behind it; walking forward,
+        # just before the nearest one ahead. Every run of cells between two
+        # obstacles shares a stop, so it is filled as one slice.
+        def fill(stops: array, first: int, last: int, stop: int):
+            if last >= first:
+                stops[start + first * stride:start + last * stride + 1:stride] = array('i', [stop]) * (last - first + 1)
+        for previous, position in zip(blocked, blocked[1:] + [length - 1]):
+            fill(self.stops[backward], previous + 1, position, start + (previous + 1) * stride)
+        for previous, position in zip([0] + blocked, blocked):
+            fill(self.stops[forward], previous, position - 1, start + (position - 1) * stride)
+
+    def stop(self, pos: Point, facing: Facing) -> Point | None:
+        top, left = pos
+        stop = self.stops[facing][top * self.width + left]
+        return None if stop < 0 else divmod(stop, self.width)
+
+    def exit_steps(self, pos: Point, facing: Facing) -> int:
+        top, left = pos
+        return {'N':top + 1, 'E':self.width - left, 'S':self.height - top, 'W':left + 1}[facing]
+
+FACING_FLAGS = {'N':1, 'E':2, 'S':4, 'W':8}
+# Number of facings set in each possible visited flag byte.
+FLAG_COUNTS = bytes(bin(flags).count('1') for flags in range(256))
+
+class GuardWalk(object):
+    # The step-by-step walk of the guard, shared by every kind of map. Each
+    # subclass stores obstacles and visited state its own way, behind
+    # is_obstacle, set_visited, is_visited and is_visited_space.
+    __slots__ = ()
+
+    def in_bounds(self, pos: Point) -> bool:
+        top, left = pos
+        return top >= 0 and top < self.height and left >= 0 and left < self.width
+
+    def guard_in_bounds(self) -> bool:
+        pos, _ = self.guard_state
+        return self.in_bounds(pos)
+
+    def advance(self):
+        if not self.guard_in_bounds():
+            return
+        pos, facing = self.guard_state
+        in_front = forward(pos, facing)
+        if self.is_obstacle(in_front):
+            self.guard_state = (pos, turn_right(facing))
+        else:
+            self.guard_state = (in_front, facing)
+        self.set_visited(*self.guard_state)
+
+    def is_in_loop(self):
+        if not self.guard_in_bounds():
+            return False
+        pos, facing = self.guard_state
+        in_front = forward(pos, facing)
+        return self.is_visited(in_front, facing)
+
+    def __step_to_end__(self) -> Literal['exit', 'loop']:
+        while not self.is_in_loop() and self.guard_in_bounds():
+            self.advance()
+        return 'loop' if self.is_in_loop() else 'exit'
+
+    def __char__(self, pos: Point) -> str:
+        guard_pos, facing = self.guard_state
+        if pos == guard_pos:
+            return facing_to_guard_char(facing)
+        elif self.is_obstacle(pos):
+            return '#'
+        elif self.is_visited_space(pos):
+            return 'o'
+        else:
+            return '.'
+
+    def __str__(self):
+        return '\n'.join(''.join(self.__char__((top, left)) for left in range(self.width)) for top in range(self.height))
+
+class Map(GuardWalk):
+    __slots__ = ('height', 'width', 'obstacles', 'added_obstacles', 'guard_state',
+                 '__jump_table__', '__obstacle_map__', '__added_cells__',
+                 '__visited_map__', '__pending_path__', '__turns__',
+                 '__visited_count__', '__path_index__')
+
     @classmethod
     def parse(self, rows: list[str]) -> Self:
         height, width = len(rows), len(rows[0])
@@ -39,106 +159,207 @@ class Map(object):
         self.height = height
         self.width = width
         self.obstacles = obstacles
+        self.added_obstacles = []
         self.guard_state = guard_state
-        self.__obstacle_map__ = [[False for left in range(width)] for top in range(height)]
-        for pos in obstacles:
-            self.set_obstacle(pos)
-        self.__visited_map__ = [[{'N':False, 'E':False, 'S':False, 'W':False} for _ in range(width)] for _ in range(height)]
-        self.set_visited(*guard_state)
-    
-    def clone(self) -> Self:
-        return Map(self.height, self.width, self.obstacles, self.guard_state)
+        # Shared between clones, so the table is only built once per layout.
+        self.__jump_table__ = [None]
+        # One byte per cell for the base layout, which is immutable and shared
+        # between clones. Added obstacles are kept apart as a set of cell
+        # indexes, so adding one never copies the layout.
+        obstacle_map = bytearray(height * width)
+        for top, left in obstacles:
+            if self.in_bounds((top, left)):
+                obstacle_map[top * width + left] = 1
+        self.__obstacle_map__ = bytes(obstacle_map)
+        self.__added_cells__ = set()
+        # One byte per cell, holding a FACING_FLAGS bit for each facing visited.
+        # Only allocated once visited state is needed; until then the path is
+        # kept as a list of (state, steps walked forward from it) to fill in.
+        self.__visited_map__ = None
+        self.__pending_path__ = [(*guard_state, 0)]
+        # Every state the guard has turned onto, for turn-point loop detection.
+        self.__turns__ = set()
+        # Kept up to date as states are marked visited: the number of visited
+        # states, and the index of every visited cell in the order first seen.
+        self.__visited_count__ = 0
+        self.__path_index__ = []
     
-    def in_bounds(self, pos: Point) -> bool:
-        top, left = pos
-        return top >= 0 and top < self.height and left >= 0 and left < self.width
-    
-    def guard_in_bounds(self) -> bool:
-        pos, _ = self.guard_state
-        return self.in_bounds(pos)
+    def clone(self, guard_state: GuardState | None = None) -> Self:
+        guard_state = guard_state or self.guard_state
+        clone = Map.__new__(Map)
+        clone.height = self.height
+        clone.width = self.width
+        clone.obstacles = self.obstacles
+        clone.added_obstacles = []
+        clone.guard_state = guard_state
+        clone.__jump_table__ = self.__jump_table__
+        clone.__obstacle_map__ = self.__obstacle_map__
+        clone.__added_cells__ = set()
+        clone.__visited_map__ = None
+        clone.__pending_path__ = [(*guard_state, 0)]
+        clone.__turns__ = set()
+        clone.__visited_count__ = 0
+        clone.__path_index__ = []
+        return clone
     
     def is_obstacle(self, pos: Point) -> bool:
         if not self.in_bounds(pos):
             return False
         top, left = pos
-        return self.__obstacle_map__[top][left]
+        idx = top * self.width + left
+        return self.__obstacle_map__[idx] == 1 or idx in self.__added_cells__
     
     def set_obstacle(self, pos: Point):
         if not self.in_bounds(pos):
             return
         top, left = pos
-        self.__obstacle_map__[top][left] = True
+        self.__added_cells__.add(top * self.width + left)
+        self.added_obstacles.append(pos)
     
     def is_visited(self, pos: Point, facing: Facing) -> bool:
         if not self.in_bounds(pos):
             return False
         top, left = pos
-        return self.__visited_map__[top][left][facing]
+        visited_map = self.__visited_map__
+        if visited_map is None or self.__pending_path__:
+            visited_map = self.__visited__()
+        return visited_map[top * self.width + left] & FACING_FLAGS[facing] != 0
     
     def is_visited_space(self, pos: Point) -> bool:
         if not self.in_bounds(pos):
             return False
         top, left = pos
-        return any(self.__visited_map__[top][left].values())
+        return self.__visited__()[top * self.width + left] != 0
     
     def set_visited(self, pos: Point, facing: Facing):
         if not self.in_bounds(pos):
             return
         top, left = pos
-        self.__visited_map__[top][left][facing] = True
+        if self.__visited_map__ is None or self.__pending_path__:
+            self.__visited__()
+        self.__mark_visited__(top * self.width + left, FACING_FLAGS[facing])
+
+    def __mark_visited__(self, idx: int, flag: int):
+        flags = self.__visited_map__[idx]
+        if flags & flag:
+            return
+        if flags == 0:
+            self.__path_index__.append(idx)
+        self.__visited_count__ += 1
+        self.__visited_map__[idx] = flags | flag
 
     def visited_count(self):
-        return sum(1
-                   for top in range(self.height)
-                   for left in range(self.width)
-                   for dir in 'NESW'
-                   if self.is_visited((top, left), dir))
+        self.__visited__()
+        return self.__visited_count__
 
     def visited_space_count(self):
-        return sum(1
-                   for top in range(self.height)
-                   for left in range(self.width)
-                   if self.is_visited_space((top, left)))
+        self.__visited__()
+        return len(self.__path_index__)
 
     def visited_spaces(self):
-        return [(top, left)
-                for top in range(self.height)
-                for left in range(self.width)
-                if self.is_visited_space((top, left))]
-    
-    def advance(self):
-        if not self.guard_in_bounds():
-            return
+        self.__visited__()
+        return [divmod(idx, self.width) for idx in sorted(self.__path_index__)]
+
+    def __visited__(self) -> bytearray:
+        if self.__visited_map__ is None:
+            self.__visited_map__ = bytearray(self.height * self.width)
+        if self.__pending_path__:
+            self.__fill_path__()
+        return self.__visited_map__
+
+    def __record_path__(self, pos: Point, facing: Facing, steps: int):
+        # Walking on from a state that was just recorded extends that entry.
+        if self.__pending_path__ and self.__pending_path__[-1] == (pos, facing, 0):
+            self.__pending_path__[-1] = (pos, facing, steps)
+        else:
+            self.__pending_path__.append((pos, facing, steps))
+
+    def __fill_path__(self):
+        pending, self.__pending_path__ = self.__pending_path__, []
+        for (top, left), facing, steps in pending:
+            dTop, dLeft = {'N':(-1,0), 'E':(0,1), 'S':(1,0), 'W':(0,-1)}[facing]
+            flag = FACING_FLAGS[facing]
+            for step in range(steps + 1):
+                pos = (top + dTop * step, left + dLeft * step)
+                if self.in_bounds(pos):
+                    self.__mark_visited__(pos[0] * self.width + pos[1], flag)
+
+    def __move__(self) -> bool:
+        # Moves or turns the guard without recording it. Returns True on a turn.
         pos, facing = self.guard_state
         in_front = forward(pos, facing)
         if self.is_obstacle(in_front):
             self.guard_state = (pos, turn_right(facing))
-        else:
-            self.guard_state = (in_front, facing)
-        self.set_visited(*self.guard_state)
-    
-    def is_in_loop(self):
+            return True
+        self.guard_state = (in_front, facing)
+        return False
+
+    def __turned_onto_visited__(self) -> bool:
+        # Records the state the guard just turned onto. A loop must contain a
+        # turn, so it is enough to detect returning to one of these.
+        if self.guard_state in self.__turns__:
+            return True
+        self.__turns__.add(self.guard_state)
+        return False
+
+    def jump_table(self) -> JumpTable:
+        if self.__jump_table__[0] is None:
+            self.__jump_table__[0] = JumpTable(self.height, self.width, self.obstacles)
+        return self.__jump_table__[0]
+
+    def teleport(self) -> bool:
+        # Jumps straight to the next turn point (or out of bounds), leaving the
+        # cells walked past to be filled in when visited state is queried.
+        # Returns True if the guard turned onto a state it has turned onto
+        # before.
         if not self.guard_in_bounds():
             return False
+        jump_table = self.jump_table()
         pos, facing = self.guard_state
-        in_front = forward(pos, facing)
-        return self.is_visited(in_front, facing)
-    
-    def run_to_end(self) -> Literal['exit', 'loop']:
-        while not self.is_in_loop() and self.guard_in_bounds():
-            self.advance()
-        return 'loop' if self.is_in_loop() else 'exit'
+        stop = jump_table.stop(pos, facing)
+        steps = jump_table.exit_steps(pos, facing) if stop is None else steps_ahead(pos, stop, facing) or 0
+        for obstacle in self.added_obstacles:
+            obstacle_steps = steps_ahead(pos, obstacle, facing)
+            if obstacle_steps is not None and obstacle_steps <= steps:
+                steps = obstacle_steps - 1
+                stop = forward(obstacle, turn_right(turn_right(facing)))
+        self.__record_path__(pos, facing, steps)
+        if stop is None:
+            top, left = pos
+            dTop, dLeft = {'N':(-1,0), 'E':(0,1), 'S':(1,0), 'W':(0,-1)}[facing]
+            self.guard_state = ((top + dTop * steps, left + dLeft * steps), facing)
+            return False
+        self.guard_state = (stop, turn_right(facing))
+        self.__record_path__(*self.guard_state, 0)
+        return self.__turned_onto_visited__()
 
-    def __char__(self, pos: Point) -> str:
-        guard_pos, facing = self.guard_state
-        if pos == guard_pos:
-            return facing_to_guard_char(facing)
-        elif self.is_obstacle(pos):
-            return '#'
-        elif self.is_visited_space(pos):
-            return 'o'
-        else:
-            return '.'
+    def run_to_end(self,
+                   engine: Literal['step', 'jump'] = 'step',
+                   loop_detection: Literal['visited', 'turns'] = 'visited') -> Literal['exit', 'loop']:
+        # The jump engine only stops at turns, so always detects loops there.
+        if engine == 'jump':
+            while self.guard_in_bounds():
+                if self.teleport():
+                    return 'loop'
+            return 'exit'
+        if loop_detection == 'turns':
+            return self.__walk_to_end__()
+        return self.__step_to_end__()
 
-    def __str__(self):
-        return '\n'.join(''.join(self.__char__((top, left)) for left in range(self.width)) for top in range(self.height))
+    def __walk_to_end__(self) -> Literal['exit', 'loop']:
+        # Steps like advance(), but only records the path as straight runs
+        # between turns, so no visited map is needed unless it is queried.
+        if not self.guard_in_bounds():
+            return 'exit'
+        (pos, facing), steps = self.guard_state, 0
+        while self.guard_in_bounds():
+            if not self.__move__():
+                steps += 1
+                continue
+            self.__record_path__(pos, facing, steps)
+            self.__record_path__(*self.guard_state, 0)
+            if self.__turned_onto_visited__():
+                return 'loop'
+            (pos, facing), steps = self.guard_state, 0
+        self.__record_path__(pos, facing, steps)
+        return 'exit'
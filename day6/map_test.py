@@ -5,6 +5,8 @@ from map import (turn_left,
                  facing_to_guard_char, 
                  guard_char_to_facing, 
                  find_in_grid, 
+                 steps_ahead,
+                 JumpTable,
                  Map)
 
 class MapTests(unittest.TestCase):
@@ -26,6 +28,15 @@ class MapTests(unittest.TestCase):
         self.assertEqual(forward((1, 1), 'S'), (2, 1))
         self.assertEqual(forward((1, 1), 'W'), (1, 0))
 
+    def test_steps_ahead(self):
+        self.assertEqual(steps_ahead((3, 3), (1, 3), 'N'), 2)
+        self.assertEqual(steps_ahead((3, 3), (3, 7), 'E'), 4)
+        self.assertEqual(steps_ahead((3, 3), (4, 3), 'S'), 1)
+        self.assertEqual(steps_ahead((3, 3), (3, 0), 'W'), 3)
+        self.assertIsNone(steps_ahead((3, 3), (5, 3), 'N'))
+        self.assertIsNone(steps_ahead((3, 3), (2, 4), 'N'))
+        self.assertIsNone(steps_ahead((3, 3), (3, 3), 'E'))
+
     def test_facing_to_guard_char(self):
         self.assertEqual(facing_to_guard_char('N'), '^')
         self.assertEqual(facing_to_guard_char('E'), '>')
@@ -64,6 +75,23 @@ class MapTests(unittest.TestCase):
         self.assertTrue(map.is_visited((2, 4), 'W'))
         self.assertEqual(map.visited_count(), 1)
 
+    def test_clone(self):
+        rows = ['.#...',
+                '....#',
+                '#...<',
+                '.##..']
+        map = Map.parse(rows)
+        map.advance()
+        clone = map.clone()
+        clone.set_obstacle((2, 2))
+        self.assertTrue(clone.is_obstacle((2, 2)))
+        self.assertFalse(map.is_obstacle((2, 2)))
+        # Adding an obstacle leaves the layout shared with the original.
+        self.assertIs(clone.__obstacle_map__, map.__obstacle_map__)
+        self.assertEqual(clone.guard_state, ((2, 3), 'W'))
+        self.assertEqual(clone.visited_count(), 1)
+        self.assertEqual(map.visited_count(), 2)
+
     def test_advance(self):
         rows = ['.#...',
                 '....#',
@@ -115,6 +143,79 @@ class MapTests(unittest.TestCase):
         self.assertEqual('loop', Map.parse(looping_map).run_to_end())
         self.assertEqual('exit', Map.parse(exiting_map).run_to_end())
 
+    def test_jump_table(self):
+        table = JumpTable(4, 5, [(0, 1), (1, 4), (2, 0), (3, 1), (3, 2)])
+        self.assertEqual(table.stop((2, 4), 'W'), (2, 1))
+        self.assertEqual(table.stop((2, 1), 'N'), (1, 1))
+        self.assertEqual(table.stop((1, 1), 'E'), (1, 3))
+        self.assertEqual(table.stop((1, 3), 'S'), None)
+        self.assertEqual(table.stop((2, 2), 'S'), (2, 2))
+        self.assertEqual(table.exit_steps((1, 3), 'S'), 3)
+
+    def test_teleport(self):
+        rows = ['.#...',
+                '....#',
+                '#...<',
+                '.##..']
+        map = Map.parse(rows)
+        self.assertFalse(map.teleport())
+        self.assertEqual(map.guard_state, ((2, 1), 'N'))
+        self.assertEqual([(2, 1), (2, 2), (2, 3), (2, 4)], map.visited_spaces())
+        self.assertFalse(map.teleport())
+        self.assertEqual(map.guard_state, ((1, 1), 'E'))
+        map.set_obstacle((1, 3))
+        self.assertFalse(map.teleport())
+        self.assertEqual(map.guard_state, ((1, 2), 'S'))
+        self.assertEqual(map.visited_count(), 9)
+
+    def test_run_to_end_jump(self):
+        looping_map = ['.#...',
+                       '....#',
+                       '#.<..',
+                       '.#.#.']
+        exiting_map = ['.#...',
+                       '....#',
+                       '#.<..',
+                       '.##..']
+        for rows in [looping_map, exiting_map]:
+            stepped, jumped = Map.parse(rows), Map.parse(rows)
+            self.assertEqual(stepped.run_to_end(), jumped.run_to_end('jump'))
+            self.assertEqual(stepped.visited_spaces(), jumped.visited_spaces())
+            self.assertEqual(stepped.visited_count(), jumped.visited_count())
+
+    def test_run_to_end_turns(self):
+        looping_map = ['.#...',
+                       '....#',
+                       '#.<..',
+                       '.#.#.']
+        exiting_map = ['.#...',
+                       '....#',
+                       '#.<..',
+                       '.##..']
+        for rows in [looping_map, exiting_map]:
+            stepped, turned = Map.parse(rows), Map.parse(rows)
+            self.assertEqual(stepped.run_to_end(), turned.run_to_end(loop_detection='turns'))
+            self.assertIsNone(turned.__visited_map__)
+            self.assertEqual(stepped.visited_spaces(), turned.visited_spaces())
+            self.assertEqual(stepped.visited_count(), turned.visited_count())
+
+    def test_run_to_end_jump_added_obstacle(self):
+        rows = ['....#.....',
+                '.........#',
+                '..........',
+                '..#.......',
+                '.......#..',
+                '..........',
+                '.#..^.....',
+                '........#.',
+                '#.........',
+                '......#...']
+        initial_map = Map.parse(rows)
+        for candidate, verdict in [((6, 3), 'loop'), ((7, 6), 'loop'), ((9, 7), 'loop'), ((1, 1), 'exit')]:
+            test_map = initial_map.clone()
+            test_map.set_obstacle(candidate)
+            self.assertEqual(test_map.run_to_end('jump'), verdict)
+
 if __name__ == '__main__':
     unittest.main()
 
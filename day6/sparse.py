@@ -0,0 +1,101 @@
+from bisect import bisect_left, insort
+from typing import Literal, Self
+import mmap
+from map import GuardWalk, Point, Facing, GuardState, FACING_FLAGS, FLAG_COUNTS, guard_char_to_facing
+
+class SparseMap(GuardWalk):
+    """A map that stores only where the obstacles and visited cells are, for
+    large grids that are mostly empty. Obstacles are indexed as a sorted list
+    of columns per row. Supports the same queries and step-by-step simulation
+    as `Map`."""
+    __slots__ = ('height', 'width', 'guard_state', 'row_obstacles', 'visited')
+
+    def __init__(self, height: int, width: int, obstacles: list[Point], guard_state: GuardState):
+        self.height = height
+        self.width = width
+        self.guard_state = guard_state
+        self.row_obstacles: dict[int, list[int]] = {}
+        for top, left in sorted(obstacles):
+            if self.in_bounds((top, left)):
+                self.row_obstacles.setdefault(top, []).append(left)
+        # Visited cells only, each holding a FACING_FLAGS bit per facing.
+        self.visited: dict[Point, int] = {}
+        self.set_visited(*guard_state)
+
+    def clone(self, guard_state: GuardState | None = None) -> Self:
+        guard_state = guard_state or self.guard_state
+        clone = SparseMap.__new__(SparseMap)
+        clone.height = self.height
+        clone.width = self.width
+        clone.guard_state = guard_state
+        # Obstacle lists are shared until an obstacle is added to one of them.
+        clone.row_obstacles = dict(self.row_obstacles)
+        clone.visited = {}
+        clone.set_visited(*guard_state)
+        return clone
+
+    def is_obstacle(self, pos: Point) -> bool:
+        if not self.in_bounds(pos):
+            return False
+        top, left = pos
+        lefts = self.row_obstacles.get(top)
+        if lefts is None:
+            return False
+        idx = bisect_left(lefts, left)
+        return idx < len(lefts) and lefts[idx] == left
+
+    def set_obstacle(self, pos: Point):
+        if not self.in_bounds(pos) or self.is_obstacle(pos):
+            return
+        top, left = pos
+        # Copied, as the list may be shared with other clones.
+        lefts = list(self.row_obstacles.get(top, ()))
+        insort(lefts, left)
+        self.row_obstacles[top] = lefts
+
+    def is_visited(self, pos: Point, facing: Facing) -> bool:
+        return self.visited.get(pos, 0) & FACING_FLAGS[facing] != 0
+
+    def is_visited_space(self, pos: Point) -> bool:
+        return pos in self.visited
+
+    def set_visited(self, pos: Point, facing: Facing):
+        if not self.in_bounds(pos):
+            return
+        self.visited[pos] = self.visited.get(pos, 0) | FACING_FLAGS[facing]
+
+    def visited_count(self):
+        return sum(FLAG_COUNTS[flags] for flags in self.visited.values())
+
+    def visited_space_count(self):
+        return len(self.visited)
+
+    def visited_spaces(self):
+        return sorted(self.visited)
+
+    def run_to_end(self, engine: Literal['step'] = 'step') -> Literal['exit', 'loop']:
+        if engine != 'step':
+            raise ValueError(f"SparseMap does not support the {engine} engine")
+        return self.__step_to_end__()
+
+def find_all(buffer: mmap.mmap, char: bytes) -> list[int]:
+    offsets = []
+    offset = buffer.find(char)
+    while offset != -1:
+        offsets.append(offset)
+        offset = buffer.find(char, offset + 1)
+    return offsets
+
+def load_sparse(filename: str) -> SparseMap:
+    """Memory-maps the file and finds the obstacles and guard with bytes-level
+    searches, so the grid is never read into memory as rows. Every row must
+    have the same length. As with `Map.parse` on the lines of a file, the
+    width includes the newline at the end of each row."""
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        width = buffer.find(b'\n') + 1 or len(buffer)
+        height = -(-len(buffer) // width)
+        obstacles = [divmod(offset, width) for offset in find_all(buffer, b'#')]
+        guard_offsets = [offset for char in b'^>v<' if (offset := buffer.find(bytes([char]))) != -1]
+        guard_offset = min(guard_offsets)
+        guard_facing = guard_char_to_facing(chr(buffer[guard_offset]))
+        return SparseMap(height, width, obstacles, (divmod(guard_offset, width), guard_facing))
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from map import Map
+from sparse import load_sparse
+
+class SparseMapTests(unittest.TestCase):
+    rows = ['....#.....\n',
+            '.........#\n',
+            '..........\n',
+            '..#.......\n',
+            '.......#..\n',
+            '..........\n',
+            '.#..^.....\n',
+            '........#.\n',
+            '#.........\n',
+            '......#...\n']
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as file:
+            file.writelines(self.rows)
+        self.filename = file.name
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_load_sparse(self):
+        sparse_map = load_sparse(self.filename)
+        dense_map = Map.parse(self.rows)
+        self.assertEqual(sparse_map.height, dense_map.height)
+        self.assertEqual(sparse_map.width, dense_map.width)
+        self.assertEqual(sparse_map.guard_state, ((6, 4), 'N'))
+        for top in range(dense_map.height):
+            for left in range(dense_map.width):
+                self.assertEqual(sparse_map.is_obstacle((top, left)), dense_map.is_obstacle((top, left)))
+        self.assertEqual(sparse_map.row_obstacles[1], [9])
+
+    def test_run_to_end(self):
+        sparse_map = load_sparse(self.filename)
+        dense_map = Map.parse(self.rows)
+        self.assertEqual(sparse_map.run_to_end(), dense_map.run_to_end())
+        self.assertEqual(sparse_map.visited_spaces(), dense_map.visited_spaces())
+        self.assertEqual(sparse_map.visited_count(), dense_map.visited_count())
+        self.assertEqual(sparse_map.visited_space_count(), 41)
+
+    def test_clone(self):
+        sparse_map = load_sparse(self.filename)
+        clone = sparse_map.clone()
+        clone.set_obstacle((6, 3))
+        self.assertEqual(clone.row_obstacles[6], [1, 3])
+        self.assertEqual(sparse_map.row_obstacles[6], [1])
+        self.assertTrue(clone.is_obstacle((6, 3)))
+        self.assertTrue(clone.is_obstacle((6, 1)))
+        self.assertFalse(sparse_map.is_obstacle((6, 3)))
+        self.assertEqual(clone.run_to_end(), 'loop')
+        self.assertEqual(sparse_map.run_to_end(), 'exit')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+from map import Map, Point, GuardState
+
+class Trajectory(object):
+    """The recorded path of a guard on an unmodified map, used to test where an
+    added obstacle would trap the guard in a loop without re-walking the part
+    of the path that the obstacle cannot affect."""
+
+    def __init__(self, initial_map: Map):
+        self.initial_map = initial_map
+        run_map = initial_map.clone()
+        self.states: list[GuardState] = [run_map.guard_state]
+        # The step at which each guard state, and each cell, was first reached.
+        self.first_visits: dict[GuardState, int] = {run_map.guard_state: 0}
+        self.first_entries: dict[Point, int] = {run_map.guard_state[0]: 0}
+        while not run_map.is_in_loop() and run_map.guard_in_bounds():
+            run_map.advance()
+            if not run_map.guard_in_bounds():
+                break
+            step = len(self.states)
+            self.states.append(run_map.guard_state)
+            pos, _ = run_map.guard_state
+            self.first_visits.setdefault(run_map.guard_state, step)
+            self.first_entries.setdefault(pos, step)
+        self.outcome = 'loop' if run_map.is_in_loop() else 'exit'
+
+    def is_loop_trap(self, candidate: Point) -> bool:
+        """Checks whether placing an obstacle at the candidate traps the guard
+        in a loop. The guard's path is unchanged up to the step before it first
+        enters the candidate cell, so the simulation resumes from there and the
+        recorded prefix stands in for the visited state of those steps."""
+        step = self.first_entries.get(candidate)
+        if step is None:
+            # The guard never goes there, so an obstacle there changes nothing.
+            return self.outcome == 'loop'
+        if step == 0:
+            raise ValueError(f"Cannot place an obstacle on the guard at {candidate}")
+        test_map = self.initial_map.clone(self.states[step - 1])
+        test_map.set_obstacle(candidate)
+        while not test_map.is_in_loop() and test_map.guard_in_bounds():
+            test_map.advance()
+            if self.first_visits.get(test_map.guard_state, step) < step:
+                return True
+        return test_map.is_in_loop()
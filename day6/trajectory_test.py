@@ -0,0 +1,43 @@
+import unittest
+from map import Map
+from trajectory import Trajectory
+
+class TrajectoryTests(unittest.TestCase):
+    rows = ['....#.....',
+            '.........#',
+            '..........',
+            '..#.......',
+            '.......#..',
+            '..........',
+            '.#..^.....',
+            '........#.',
+            '#.........',
+            '......#...']
+
+    def test_record(self):
+        map = Map.parse(self.rows)
+        trajectory = Trajectory(map)
+        self.assertEqual(trajectory.states[0], ((6, 4), 'N'))
+        self.assertEqual(trajectory.states[6], ((1, 4), 'E'))
+        self.assertEqual(trajectory.first_entries[(1, 4)], 5)
+        self.assertEqual(trajectory.outcome, 'exit')
+        self.assertEqual(len(trajectory.first_entries), 41)
+
+    def test_is_loop_trap(self):
+        map = Map.parse(self.rows)
+        trajectory = Trajectory(map)
+        run_map = map.clone()
+        run_map.run_to_end()
+        candidates = run_map.visited_spaces()
+        candidates.remove((6, 4))
+        for candidate in candidates:
+            test_map = map.clone()
+            test_map.set_obstacle(candidate)
+            self.assertEqual(trajectory.is_loop_trap(candidate), test_map.run_to_end() == 'loop', candidate)
+        self.assertEqual(sum(1 for candidate in candidates if trajectory.is_loop_trap(candidate)), 6)
+        self.assertFalse(trajectory.is_loop_trap((0, 0)))
+        with self.assertRaises(ValueError):
+            trajectory.is_loop_trap((6, 4))
+
+if __name__ == '__main__':
+    unittest.main()
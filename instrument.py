@@ -0,0 +1,134 @@
+from typing import Any, Callable, Iterable, Iterator, Literal, TextIO
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import json
+import sys
+import time
+
+# Shared by every day. Everything here is off until `enable` is called, and
+# while off each hook costs at most a flag check: trace messages are only
+# formatted when tracing, and `metered` and `count_calls` leave the code they
+# are given untouched.
+#
+# State is kept per process. Counts from pool workers are only seen if the
+# workers send back what `take_counters` returns and the parent adds it.
+
+tracing = False
+profiling = False
+
+counters: Counter[str] = Counter()
+# Wall-clock and CPU seconds spent in each stage, not counting time spent in
+# stages nested inside it.
+timings: defaultdict[str, list[float]] = defaultdict(lambda: [0.0, 0.0])
+notes: dict[str, Any] = {}
+
+# Time spent in nested stages, one entry per stage currently running.
+nested: list[list[float]] = []
+
+def enable(trace: bool = False, profile: bool = False) -> None:
+    global tracing, profiling
+    tracing, profiling = trace, profile
+
+def reset() -> None:
+    counters.clear()
+    timings.clear()
+    notes.clear()
+    nested.clear()
+
+def logd(message: Any, *args: Any) -> None:
+    # Formats `message % args` only when tracing.
+    if tracing:
+        print(message % args if args else message, file=sys.stderr)
+
+def count(name: str, n: int = 1) -> None:
+    if profiling:
+        counters[name] += n
+
+def take_counters() -> Counter[str]:
+    # The counts so far, which then start again from zero.
+    taken = counters.copy()
+    counters.clear()
+    return taken
+
+def note(name: str, value: Any) -> None:
+    if profiling:
+        notes[name] = value
+
+def start() -> tuple[float, float]:
+    nested.append([0.0, 0.0])
+    return time.perf_counter(), time.process_time()
+
+def stop(stage: str, started: tuple[float, float]) -> None:
+    wall, cpu = time.perf_counter() - started[0], time.process_time() - started[1]
+    nested_wall, nested_cpu = nested.pop()
+    timing = timings[stage]
+    timing[0] += wall - nested_wall
+    timing[1] += cpu - nested_cpu
+    if nested:
+        nested[-1][0] += wall
+        nested[-1][1] += cpu
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    if not profiling:
+        yield
+        return
+    started = start()
+    try:
+        yield
+    finally:
+        stop(stage, started)
+
+def metered[T](stage: str, iterable: Iterable[T]) -> Iterable[T]:
+    # Counts the items of a pipeline stage and times producing them. Stages
+    # wrapped around each other are timed separately.
+    if not profiling:
+        return iterable
+    return metered_items(stage, iter(iterable))
+
+def metered_items[T](stage: str, iterator: Iterator[T]) -> Iterator[T]:
+    while True:
+        started = start()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            stop(stage, started)
+        counters[stage] += 1
+        yield item
+
+def count_calls(cls: type, method: str, name: str | None = None) -> None:
+    # Replaces a method with one that counts its calls. Done only when
+    # profiling, so the method is unchanged otherwise.
+    if not profiling:
+        return
+    name = name or f"{cls.__name__}.{method}"
+    original: Callable = getattr(cls, method)
+    def counted(*args, **kwargs):
+        counters[name] += 1
+        return original(*args, **kwargs)
+    setattr(cls, method, counted)
+
+def summary() -> dict[str, Any]:
+    stages = {stage: {'wall': wall, 'cpu': cpu, 'items': counters.get(stage, 0),
+                      'per_second': counters.get(stage, 0) / wall if wall > 0 else None}
+              for stage, (wall, cpu) in timings.items()}
+    other_counters = {name: n for name, n in counters.items() if name not in timings}
+    return {'stages': stages, 'counters': other_counters, 'notes': notes}
+
+def report(out: TextIO = sys.stderr, format: Literal['text', 'json'] = 'text') -> None:
+    results = summary()
+    if format == 'json':
+        json.dump(results, out)
+        print(file=out)
+        return
+    for stage, timing in results['stages'].items():
+        line = f"{stage:>20}: {timing['wall']:9.3f}s wall {timing['cpu']:9.3f}s cpu"
+        if timing['items'] and timing['per_second'] is not None:
+            line += f" {timing['items']:>10} items {timing['per_second']:12.0f}/s"
+        print(line, file=out)
+    for name, n in results['counters'].items():
+        print(f"{name:>20}: {n}", file=out)
+    for name, value in results['notes'].items():
+        print(f"{name:>20}: {value}", file=out)
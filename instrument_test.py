@@ -0,0 +1,57 @@
+import io
+import json
+import unittest
+import instrument
+
+class Counted(object):
+    def step(self):
+        return 1
+
+class InstrumentTests(unittest.TestCase):
+    def tearDown(self):
+        instrument.enable()
+        instrument.reset()
+
+    def test_disabled(self):
+        items = [1, 2, 3]
+        self.assertIs(instrument.metered('stage', items), items)
+        step = Counted.step
+        instrument.count_calls(Counted, 'step')
+        self.assertIs(Counted.step, step)
+        instrument.count('name')
+        self.assertEqual(instrument.summary(), {'stages': {}, 'counters': {}, 'notes': {}})
+
+    def test_profile(self):
+        instrument.enable(profile=True)
+        outer = instrument.metered('outer', (x * 2 for x in instrument.metered('inner', range(5))))
+        self.assertEqual(list(outer), [0, 2, 4, 6, 8])
+        with instrument.timer('outer'):
+            pass
+        instrument.count('name', 3)
+        results = instrument.summary()
+        self.assertEqual(results['stages']['inner']['items'], 5)
+        self.assertEqual(results['stages']['outer']['items'], 5)
+        self.assertEqual(results['counters'], {'name': 3})
+        out = io.StringIO()
+        instrument.report(out, 'json')
+        self.assertEqual(json.loads(out.getvalue())['counters'], {'name': 3})
+
+    def test_count_calls(self):
+        original = Counted.step
+        instrument.enable(profile=True)
+        try:
+            instrument.count_calls(Counted, 'step')
+            Counted().step()
+            Counted().step()
+            self.assertEqual(instrument.counters['Counted.step'], 2)
+        finally:
+            Counted.step = original
+
+    def test_take_counters(self):
+        instrument.enable(profile=True)
+        instrument.count('name', 2)
+        self.assertEqual(instrument.take_counters(), {'name': 2})
+        self.assertEqual(instrument.take_counters(), {})
+
+if __name__ == '__main__':
+    unittest.main()
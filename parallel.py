@@ -0,0 +1,27 @@
+from typing import Any, Callable, Iterable, Iterator
+from collections import deque
+import multiprocessing
+import multiprocessing.pool
+
+# Shared by every day that checks its input in a process pool.
+
+def fork_pool(workers: int, initializer: Callable[..., None] | None = None, initargs: tuple = ()) -> multiprocessing.pool.Pool:
+    # Forks where the platform allows it, so workers inherit the initializer's
+    # arguments from the parent rather than having them pickled.
+    start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    context = multiprocessing.get_context(start_method)
+    return context.Pool(workers, initializer=initializer, initargs=initargs)
+
+def bounded_imap[T, R](pool: multiprocessing.pool.Pool, function: Callable[[T], R], items: Iterable[T], in_flight: int) -> Iterator[R]:
+    # Like `pool.imap`, results in the order of the items, but with at most
+    # `in_flight` items handed to the pool at a time. `imap` takes items as
+    # fast as it can, so reading a large file into it holds the whole file in
+    # memory.
+    pending: deque[Any] = deque()
+    for item in items:
+        pending.append(pool.apply_async(function, (item,)))
+        # Wait on the oldest item before taking any more.
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
@@ -0,0 +1,25 @@
+import unittest
+from parallel import fork_pool, bounded_imap
+
+def square(x: int) -> int:
+    return x * x
+
+class BoundedImapTests(unittest.TestCase):
+    def test_in_order(self):
+        with fork_pool(2) as pool:
+            self.assertEqual(list(bounded_imap(pool, square, range(20), 3)), [x * x for x in range(20)])
+            self.assertEqual(list(bounded_imap(pool, square, [], 3)), [])
+
+    def test_bounded(self):
+        taken = []
+        def items():
+            for x in range(20):
+                taken.append(x)
+                yield x
+        with fork_pool(2) as pool:
+            for idx, result in enumerate(bounded_imap(pool, square, items(), 3)):
+                self.assertEqual(result, idx * idx)
+                self.assertLessEqual(len(taken), idx + 3)
+
+if __name__ == '__main__':
+    unittest.main()